@@ -54,7 +54,7 @@ export const ImageGrid: React.FC<ImageGridProps> = ({
 
   const getImageSource = async (image: ImageType) => {
     const localPath = await offlineService.getLocalImagePath(image.id)
-    return localPath ? { uri: localPath } : { uri: apiService.getImageUrl(image.filename) }
+    return localPath ? { uri: localPath } : { uri: apiService.getImageUrl(image) }
   }
 
   const renderSyncIndicators = (image: ImageType) => {
@@ -112,7 +112,7 @@ export const ImageGrid: React.FC<ImageGridProps> = ({
         }}
       >
         <Image
-          source={{ uri: apiService.getImageUrl(item.filename) }}
+          source={{ uri: apiService.getImageUrl(item) }}
           style={styles.image}
           contentFit="cover"
           transition={200}
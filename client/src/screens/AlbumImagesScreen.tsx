@@ -201,7 +201,7 @@ export const AlbumImagesScreen: React.FC<AlbumImagesScreenProps> = ({ navigation
         }
       }}
     >
-      <Image source={{ uri: apiService.getImageUrl(item.filename) }} style={styles.image} resizeMode="cover" />
+      <Image source={{ uri: apiService.getImageUrl(item) }} style={styles.image} resizeMode="cover" />
       {item.status === "pending" && (
         <View style={styles.pendingBadge}>
           <Text style={styles.pendingText}>Pending</Text>
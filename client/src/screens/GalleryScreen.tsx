@@ -245,7 +245,7 @@ export const GalleryScreen: React.FC<GalleryScreenProps> = ({
       }
 
       // Priority 2: Cached image from viewer cache
-      const networkUrl = apiService.getImageUrl(serverImage.filename)
+      const networkUrl = apiService.getImageUrl(serverImage)
       try {
         const cachedUri = await imageCacheService.getCachedImageUri(
           networkUrl,
@@ -292,7 +292,7 @@ export const GalleryScreen: React.FC<GalleryScreenProps> = ({
           if ("localId" in item) {
             newResolvedUris.set(id, item.localUri)
           } else {
-            newResolvedUris.set(id, apiService.getImageUrl(item.filename))
+            newResolvedUris.set(id, apiService.getImageUrl(item))
           }
         }
       })
@@ -320,7 +320,7 @@ export const GalleryScreen: React.FC<GalleryScreenProps> = ({
       if ("localId" in img) {
         return img.localUri
       } else {
-        return apiService.getImageUrl(img.filename)
+        return apiService.getImageUrl(img)
       }
     })
   }, [images, resolvedUris])
@@ -213,7 +213,7 @@ export const ImageDetailScreen: React.FC<ImageDetailScreenProps> = ({ navigation
       }
 
       setIsDownloading(true)
-      const imageUrl = apiService.getImageUrl(currentImage.filename)
+      const imageUrl = apiService.getImageUrl(currentImage)
       const fileUri = FileSystem.documentDirectory + currentImage.filename
 
       const downloadResult = await FileSystem.downloadAsync(imageUrl, fileUri)
@@ -306,7 +306,7 @@ export const ImageDetailScreen: React.FC<ImageDetailScreenProps> = ({ navigation
           <PinchGestureHandler onGestureEvent={pinchHandler}>
             <Animated.View style={[{ flex: 1 }, animatedStyle]}>
               <Image
-                source={{ uri: apiService.getImageUrl(currentImage.filename) }}
+                source={{ uri: apiService.getImageUrl(currentImage) }}
                 style={styles.image}
                 resizeMode="contain"
               />
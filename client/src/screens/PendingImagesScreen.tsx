@@ -85,7 +85,7 @@ export const PendingImagesScreen: React.FC<PendingImagesScreenProps> = ({ naviga
         style={styles.imageContainer}
         onPress={() => navigation.navigate("ImageDetail", { image: item })}
       >
-        <Image source={{ uri: apiService.getImageUrl(item.filename) }} style={styles.image} resizeMode="cover" />
+        <Image source={{ uri: apiService.getImageUrl(item) }} style={styles.image} resizeMode="cover" />
       </TouchableOpacity>
 
       <View style={styles.actionButtons}>
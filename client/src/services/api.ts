@@ -202,11 +202,13 @@ class ApiService {
     });
   }
 
-  getImageUrl(filename: string): string {
-    const baseUrl = API_BASE_URL.endsWith("/")
-      ? API_BASE_URL.slice(0, -1)
-      : API_BASE_URL;
-    return `${baseUrl}/api/images/${filename}`;
+  // Listings return a signed `url`, the only way to fetch pending images.
+  // Without one, fall back to the unsigned route (approved images only).
+  getImageUrl(image: Pick<Image, "filename" | "url">): string {
+    if (image.url) {
+      return this.buildUrl(image.url);
+    }
+    return this.buildUrl(`/api/images/${image.filename}`);
   }
 }
 
@@ -60,7 +60,8 @@ class ImageCacheService {
       return null;
     }
 
-    const filenameFromUrl = networkUrl.split("/").pop();
+    // signed URLs carry the expiry and signature in the query string
+    const filenameFromUrl = networkUrl.split("?")[0].split("/").pop();
     const fileExtension = filenameFromUrl
       ? filenameFromUrl.split(".").pop()
       : "jpg";
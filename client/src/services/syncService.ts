@@ -474,7 +474,7 @@ class SyncService {
           downloadProgress: 0,
         });
 
-        const imageUrl = apiService.getImageUrl(download.filename);
+        const imageUrl = apiService.getImageUrl({ filename: download.filename });
         if (!UrlHelper.isValidUrl(imageUrl)) {
           throw new Error(`Invalid image URL: ${imageUrl}`);
         }
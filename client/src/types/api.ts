@@ -17,6 +17,7 @@ export interface Album {
 export interface Image {
   id: number;
   filename: string;
+  url?: string; // signed by the server, expires (IMAGE_URL_TTL)
   album_id?: number;
   status?: "pending" | "approved" | "rejected";
   uploaded_by?: string;
@@ -8,6 +8,12 @@ db = SQLAlchemy()
 migrate = Migrate()
 
 
+def _include_name(name, type_, parent_names) -> bool:
+    # search_index (and its FTS5 shadow tables) is not a model; keep
+    # autogenerate from proposing to drop it
+    return not (type_ == "table" and name.startswith("search_index"))
+
+
 def create_app() -> Flask:
     from .config import Config
 
@@ -47,8 +53,18 @@ def create_app() -> Flask:
         }
     })
 
+    if app.config["SQLALCHEMY_DATABASE_URI"].startswith("postgresql"):
+        from .pool import make_psycopg_green
+        make_psycopg_green()
+
     db.init_app(app)
-    migrate.init_app(app, db)
+    migrate.init_app(app, db, include_name=_include_name)
+
+    from .cache import response_cache
+    response_cache.init_app(app)
+
+    from .events import events
+    events.init_app(app)
     with app.app_context():
         db.create_all()
 
@@ -56,4 +72,7 @@ def create_app() -> Flask:
     from .routes import register_blueprints
     register_blueprints(app)
 
+    from .cli import register_commands
+    register_commands(app)
+
     return app
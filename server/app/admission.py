@@ -0,0 +1,126 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import current_app, g, jsonify, request
+
+from .models import UserRole
+
+
+class Busy(Exception):
+    def __init__(self, retry_after: float) -> None:
+        super().__init__("upload capacity exhausted")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.last = time.monotonic()
+
+    def take(self) -> float:
+        """Take a token; returns 0, or the seconds until one is available."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class UploadGate:
+    """
+    Admission control for uploads, per worker process.
+
+    At most UPLOAD_MAX_CONCURRENT uploads run at once; up to
+    UPLOAD_QUEUE_SIZE more wait for a slot (UPLOAD_QUEUE_TIMEOUT seconds at
+    most), and anything beyond that is turned away. Waiting admins are
+    always let in before waiting consumers. Consumers additionally get a
+    token bucket each (UPLOAD_RATE uploads per second, UPLOAD_BURST deep).
+    """
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = {True: 0, False: 0}  # by priority
+        self._buckets: dict[int, TokenBucket] = {}
+        self._buckets_lock = threading.Lock()
+
+    def throttle(self, user_id: int) -> float:
+        """Charge one upload to the user; returns seconds to wait, or 0."""
+        with self._buckets_lock:
+            bucket = self._buckets.get(user_id)
+            if bucket is None:
+                bucket = self._buckets[user_id] = TokenBucket(
+                    current_app.config["UPLOAD_RATE"],
+                    current_app.config["UPLOAD_BURST"])
+            return bucket.take()
+
+    def _may_enter(self, priority: bool, limit: int) -> bool:
+        return self._active < limit and (priority or not self._waiting[True])
+
+    @contextmanager
+    def slot(self, priority: bool):
+        limit = current_app.config["UPLOAD_MAX_CONCURRENT"]
+        timeout = current_app.config["UPLOAD_QUEUE_TIMEOUT"]
+        with self._cond:
+            if not self._may_enter(priority, limit):
+                if sum(self._waiting.values()) >= current_app.config["UPLOAD_QUEUE_SIZE"]:
+                    raise Busy(timeout)
+                self._waiting[priority] += 1
+                try:
+                    admitted = self._cond.wait_for(
+                        lambda: self._may_enter(priority, limit), timeout)
+                finally:
+                    self._waiting[priority] -= 1
+                if not admitted:
+                    # consumers held back only by this waiter may go now
+                    self._cond.notify_all()
+                    raise Busy(timeout)
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify_all()
+
+
+upload_gate = UploadGate()
+
+
+def _too_many(error: str, retry_after: float):
+    resp = jsonify(error=error)
+    resp.status_code = 429
+    resp.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    return resp
+
+
+def upload_admission(func):
+    """
+    Rate limit and queue uploads, answering 429 with Retry-After when the
+    user is over their rate or the queue is full. The rate is checked before
+    the body is read; the slot is only taken once the whole upload has been
+    received, so slow connections do not hold one. Must be applied below
+    login_required.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        admin = g.current_user.role == UserRole.ADMIN
+        if not admin:
+            wait = upload_gate.throttle(g.current_user.id)
+            if wait:
+                return _too_many("Upload rate limit exceeded", wait)
+        request.files  # receive and spool the upload outside the slot
+        try:
+            with upload_gate.slot(priority=admin):
+                return func(*args, **kwargs)
+        except Busy as e:
+            return _too_many("Too many uploads in progress, retry later", e.retry_after)
+
+    return wrapper
@@ -0,0 +1,197 @@
+import fcntl
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from pathlib import Path
+
+from flask import Flask, current_app, g, request
+
+
+class LocalBackend:
+    """
+    In-memory implementation of the shared backend interface. Stands in for
+    Redis in tests; in production it only spans a single process.
+    """
+
+    def __init__(self) -> None:
+        self._data: dict[str, tuple[float | None, bytes]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            expires, value = self._data.get(key, (None, None))
+            if expires is not None and expires < time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            value = int(self._data.get(key, (None, b"0"))[1]) + 1
+            self._data[key] = (None, str(value).encode())
+            return value
+
+
+class FileCounters:
+    """
+    Version counters shared by the worker processes of one host: a small
+    file per counter, replaced atomically so readers never see a partial
+    write, and incremented under an exclusive lock.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self._dir = Path(directory)
+
+    def _path(self, key: str) -> Path:
+        return self._dir / key.replace("/", "_").replace(":", "_")
+
+    def get(self, key: str) -> int:
+        try:
+            return int(self._path(key).read_bytes() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def incr(self, key: str) -> int:
+        self._dir.mkdir(parents=True, exist_ok=True)
+        with open(self._dir / ".lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            value = self.get(key) + 1
+            fd, tmp = tempfile.mkstemp(dir=self._dir)
+            with os.fdopen(fd, "w") as f:
+                f.write(str(value))
+            os.replace(tmp, self._path(key))
+        return value
+
+
+class RedisBackend:
+    def __init__(self, url: str) -> None:
+        import redis  # optional dependency, only needed with CACHE_REDIS_URL
+
+        self._redis = redis.Redis.from_url(url)
+
+    def get(self, key: str) -> bytes | None:
+        return self._redis.get(key)
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        self._redis.set(key, value, ex=ttl)
+
+    def incr(self, key: str) -> int:
+        return self._redis.incr(key)
+
+
+class ResponseCache:
+    """
+    Read-through cache for JSON listings.
+
+    Every cached body belongs to a scope ("albums", "album:<id>") whose
+    version counter is part of the key, so a write only has to bump the
+    counter and stale entries are never looked up again. Bodies live in a
+    per-process LRU and, when a shared backend is configured, in the backend
+    too. Version counters live in the shared backend when there is one, and
+    otherwise in files under RESPONSE_CACHE_DIR, so a bump reaches every
+    gunicorn worker on the host before the write's response is sent.
+    """
+
+    def __init__(self) -> None:
+        self._lru: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._counters: FileCounters | None = None
+        self._lock = threading.Lock()
+        self._backend = None
+        self.max_entries = 512
+        self.ttl = 60
+
+    def init_app(self, app: Flask, backend=None) -> None:
+        self.max_entries = app.config["RESPONSE_CACHE_SIZE"]
+        # cached listings carry signed image URLs; never serve one expired
+        self.ttl = min(app.config["RESPONSE_CACHE_TTL"], app.config["IMAGE_URL_TTL"])
+        if backend is None and app.config.get("CACHE_REDIS_URL"):
+            backend = RedisBackend(app.config["CACHE_REDIS_URL"])
+        self._backend = backend
+        self._counters = FileCounters(app.config["RESPONSE_CACHE_DIR"])
+        self.clear()
+        app.extensions["response_cache"] = self
+
+    def clear(self) -> None:
+        with self._lock:
+            self._lru.clear()
+
+    def version(self, scope: str) -> int:
+        if self._backend is not None:
+            return int(self._backend.get(f"cache:v:{scope}") or 0)
+        return self._counters.get(scope)
+
+    def bump(self, *scopes: str) -> None:
+        """Invalidate everything cached under the given scopes."""
+        for scope in scopes:
+            if self._backend is not None:
+                self._backend.incr(f"cache:v:{scope}")
+            else:
+                self._counters.incr(scope)
+
+    def get(self, key: str) -> bytes | None:
+        now = time.monotonic()
+        with self._lock:
+            hit = self._lru.get(key)
+            if hit is not None:
+                if hit[0] > now:
+                    self._lru.move_to_end(key)
+                    return hit[1]
+                del self._lru[key]
+        if self._backend is None:
+            return None
+        body = self._backend.get(f"cache:r:{key}")
+        if body is not None:
+            self._remember(key, body)
+        return body
+
+    def set(self, key: str, body: bytes) -> None:
+        self._remember(key, body)
+        if self._backend is not None:
+            self._backend.set(f"cache:r:{key}", body, self.ttl)
+
+    def _remember(self, key: str, body: bytes) -> None:
+        with self._lock:
+            self._lru[key] = (time.monotonic() + self.ttl, body)
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+
+
+response_cache = ResponseCache()
+
+
+def cached_listing(scope):
+    """
+    Cache a JSON view per scope version, endpoint, role and query string
+    (which carries the page). `scope` maps the view args to a scope name.
+    Must be applied below login_required.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            name = scope(**kwargs)
+            key = "|".join((
+                request.endpoint,
+                f"{name}@{response_cache.version(name)}",
+                g.current_user.role.value,
+                request.query_string.decode(),
+            ))
+            body = response_cache.get(key)
+            if body is not None:
+                return current_app.response_class(body, mimetype="application/json")
+
+            rv = current_app.make_response(func(*args, **kwargs))
+            if rv.status_code == 200:
+                response_cache.set(key, rv.get_data())
+            return rv
+
+        return wrapper
+
+    return decorator
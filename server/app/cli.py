@@ -0,0 +1,82 @@
+from pathlib import Path
+
+import click
+
+
+def register_commands(app):
+    @app.cli.command("search-reindex")
+    def search_reindex():
+        """Rebuild the full-text search index from the database."""
+        from .search import rebuild
+
+        click.echo(f"indexed {rebuild()} documents")
+
+    @app.cli.command("album-stats-refresh")
+    def album_stats_refresh():
+        """Recompute the precomputed per-album statistics."""
+        from .cache import response_cache
+        from .models import Album, AlbumStats, db
+
+        ids = [a for a, in db.session.query(Album.id)]
+        AlbumStats.refresh(*ids)
+        db.session.commit()
+        response_cache.bump("albums")
+        click.echo(f"refreshed {len(ids)} albums")
+
+    @app.cli.command("phash-backfill")
+    def phash_backfill():
+        """Compute perceptual hashes for images stored without one."""
+        from .models import Image, db
+        from .utils import dhash
+
+        done = failed = 0
+        for img in Image.query.filter(Image.phash.is_(None)).all():
+            try:
+                img.phash = dhash((img.album.dir_path / img.filename).read_bytes())
+                done += 1
+            except (OSError, ValueError):
+                failed += 1
+        db.session.commit()
+        click.echo(f"hashed {done} images, {failed} unreadable")
+
+    @app.cli.command("storage-scrub")
+    @click.option("--delete", is_flag=True,
+                  help="Remove orphans instead of only reporting them.")
+    @click.option("--verify", is_flag=True,
+                  help="Also re-hash files and compare with the stored sha256.")
+    @click.option("--max-rate", type=float, default=20.0, show_default=True,
+                  help="Hashing read limit in MB/s (0 = unlimited).")
+    @click.option("--grace", type=int, default=60, show_default=True,
+                  help="Minutes before a file without a row counts as orphaned.")
+    @click.option("--state", "state_file", type=click.Path(path_type=Path),
+                  help="Checkpoint file for resuming an interrupted scan.")
+    @click.option("--resume", is_flag=True,
+                  help="Continue from the checkpoint in --state.")
+    @click.option("--max-missing", type=float, default=5.0, show_default=True,
+                  help="Refuse to delete rows if more than this percentage is missing.")
+    @click.option("--max-orphans", type=float, default=5.0, show_default=True,
+                  help="Refuse to delete files if more than this percentage is orphaned.")
+    @click.option("--force", is_flag=True,
+                  help="Delete even if the storage looks unmounted or the database wrong.")
+    def storage_scrub(delete, verify, max_rate, grace, state_file, resume,
+                      max_missing, max_orphans, force):
+        """Cross-check the Image table against the storage directory."""
+        from .scrub import ScrubRefused, scrub
+
+        refused = None
+        try:
+            counts = scrub(
+                app.config["STORAGE_PATH"], click.echo,
+                delete=delete, verify=verify, max_rate=max_rate * 1024 * 1024,
+                grace=grace * 60, state_file=state_file, resume=resume,
+                force=force, max_missing=max_missing / 100,
+                max_orphans=max_orphans / 100,
+            )
+        except ScrubRefused as e:
+            refused, counts = e, e.counts
+        click.echo(", ".join(
+            f"{key}: {counts[key]}"
+            for key in ("files", "missing", "orphan", "orphan-dir", "foreign",
+                        "unreadable", "size", "hash")))
+        if refused is not None:
+            raise click.ClickException(str(refused))
@@ -3,6 +3,8 @@ from pathlib import Path
 
 from dotenv import load_dotenv
 
+from .pool import engine_options, normalize_url
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 load_dotenv(BASE_DIR / ".env")
 
@@ -13,12 +15,49 @@ class Config:
     CONSUMER_API_KEY = os.environ["CONSUMER_API_KEY"]
 
     # database
-    SQLALCHEMY_DATABASE_URI = (
+    SQLALCHEMY_DATABASE_URI = normalize_url(
         os.environ.get("DATABASE_URL")
         or f"sqlite:///{BASE_DIR/'image_service.db'}"
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # connection pool, per worker process (Postgres only). A gevent worker
+    # runs many requests at once but each holds a connection only briefly;
+    # keep workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) below max_connections
+    DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 10))
+    DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+    DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 10))
+    DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 1800))
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(
+        SQLALCHEMY_DATABASE_URI, DB_POOL_SIZE, DB_MAX_OVERFLOW,
+        DB_POOL_TIMEOUT, DB_POOL_RECYCLE)
 
     # storage
     STORAGE_PATH = Path(os.environ.get("STORAGE_PATH", BASE_DIR / "storage"))
     STORAGE_PATH.mkdir(parents=True, exist_ok=True)
+    # listings hand out signed image URLs valid for IMAGE_URL_TTL to twice that
+    IMAGE_URL_TTL = int(os.environ.get("IMAGE_URL_TTL", 3600))
+    # ingest: bake EXIF orientation into JPEGs and strip GPS, maker notes
+    # and embedded previews; optionally keep the untouched upload as well
+    STRIP_METADATA = os.environ.get("STRIP_METADATA", "").lower() in ("1", "true", "yes")
+    KEEP_ORIGINALS = os.environ.get("KEEP_ORIGINALS", "").lower() in ("1", "true", "yes")
+
+    # upload admission control, per worker process
+    UPLOAD_MAX_CONCURRENT = int(os.environ.get("UPLOAD_MAX_CONCURRENT", 4))
+    UPLOAD_QUEUE_SIZE = int(os.environ.get("UPLOAD_QUEUE_SIZE", 16))
+    UPLOAD_QUEUE_TIMEOUT = float(os.environ.get("UPLOAD_QUEUE_TIMEOUT", 30))
+    # per consumer: sustained uploads per second and burst size
+    UPLOAD_RATE = float(os.environ.get("UPLOAD_RATE", 1))
+    UPLOAD_BURST = int(os.environ.get("UPLOAD_BURST", 30))
+
+    # response cache for listings; invalidations reach the other gunicorn
+    # workers through version files in RESPONSE_CACHE_DIR, or through Redis
+    # with CACHE_REDIS_URL, which also shares the cached bodies
+    RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", 512))
+    RESPONSE_CACHE_TTL = int(os.environ.get("RESPONSE_CACHE_TTL", 60))
+    RESPONSE_CACHE_DIR = Path(os.environ.get("RESPONSE_CACHE_DIR", BASE_DIR / "run" / "cache"))
+    CACHE_REDIS_URL = os.environ.get("CACHE_REDIS_URL")
+
+    # server-sent events; workers exchange events through unix sockets here
+    EVENTS_SOCKET_DIR = Path(os.environ.get("EVENTS_SOCKET_DIR", BASE_DIR / "run" / "events"))
+    EVENTS_HEARTBEAT = int(os.environ.get("EVENTS_HEARTBEAT", 15))
+    EVENTS_QUEUE_SIZE = int(os.environ.get("EVENTS_QUEUE_SIZE", 100))
@@ -0,0 +1,76 @@
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over integer hashes with Hamming distance, so a
+    radius query only visits subtrees whose edge distance can still match.
+    """
+
+    def __init__(self) -> None:
+        # node: (hash, items with that hash, {distance: child node})
+        self._root: tuple[int, list, dict] | None = None
+
+    def add(self, key: int, item: Any) -> None:
+        if self._root is None:
+            self._root = (key, [item], {})
+            return
+        node = self._root
+        while True:
+            d = hamming(key, node[0])
+            if d == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = (key, [item], {})
+                return
+            node = child
+
+    def search(self, key: int, radius: int) -> Iterator[Any]:
+        """Yield every item whose hash is within `radius` bits of `key`."""
+        if self._root is None:
+            return
+        stack = [self._root]
+        while stack:
+            node_key, items, children = stack.pop()
+            d = hamming(key, node_key)
+            if d <= radius:
+                yield from items
+            for edge, child in children.items():
+                if d - radius <= edge <= d + radius:
+                    stack.append(child)
+
+
+def cluster(entries: Iterable[tuple[int, Any]], radius: int) -> list[list[Any]]:
+    """
+    Group (hash, item) pairs into clusters of near-duplicates: items end up
+    together when a chain of pairs within `radius` bits connects them.
+    Singletons are dropped.
+    """
+    entries = list(entries)
+    tree = BKTree()
+    for idx, (key, _) in enumerate(entries):
+        tree.add(key, idx)
+
+    parent = list(range(len(entries)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for idx, (key, _) in enumerate(entries):
+        for other in tree.search(key, radius):
+            parent[find(other)] = find(idx)
+
+    groups: dict[int, list[Any]] = {}
+    for idx, (_, item) in enumerate(entries):
+        groups.setdefault(find(idx), []).append(item)
+    return [g for g in groups.values() if len(g) > 1]
@@ -0,0 +1,149 @@
+import json
+import logging
+import os
+import queue
+import socket
+import threading
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+from flask import Flask, Response, current_app
+
+from . import db
+
+log = logging.getLogger(__name__)
+
+
+class EventBroker:
+    """
+    In-process pub/sub for change notifications.
+
+    Subscribers get a bounded queue per channel; a slow subscriber loses
+    events instead of blocking the publisher. To reach subscribers held by
+    other gunicorn workers, every process binds a unix datagram socket in
+    EVENTS_SOCKET_DIR and publishing also sends the event to every other
+    socket found there. Under the gevent worker the listener thread and the
+    blocked subscribers are greenlets, so idle streams cost a queue each.
+    """
+
+    def __init__(self) -> None:
+        self._subscribers: dict[str, set[queue.Queue]] = {}
+        self._lock = threading.Lock()
+        self._socket_dir: Path | None = None
+        self._sender: socket.socket | None = None
+        self._sock_path: Path | None = None
+        self._pid: int | None = None
+        self.queue_size = 100
+
+    def init_app(self, app: Flask) -> None:
+        self._socket_dir = Path(app.config["EVENTS_SOCKET_DIR"])
+        self.queue_size = app.config["EVENTS_QUEUE_SIZE"]
+        app.extensions["events"] = self
+
+    @contextmanager
+    def subscribe(self, channel: str) -> Iterator[queue.Queue]:
+        self._ensure_listener()
+        q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(q)
+        try:
+            yield q
+        finally:
+            with self._lock:
+                subs = self._subscribers.get(channel)
+                if subs is not None:
+                    subs.discard(q)
+                    if not subs:
+                        del self._subscribers[channel]
+
+    def publish(self, channel: str, event: dict) -> None:
+        self._fanout(channel, event)
+        if self._socket_dir is None:
+            return
+        self._ensure_listener()
+        payload = json.dumps({"channel": channel, "event": event}).encode()
+        for peer in self._socket_dir.glob("*.sock"):
+            if peer == self._sock_path:
+                continue
+            try:
+                self._sender.sendto(payload, str(peer))
+            except (ConnectionRefusedError, FileNotFoundError):
+                # worker is gone; nobody is bound to the path any more
+                peer.unlink(missing_ok=True)
+            except OSError:
+                # peer buffer full: notifications are best effort
+                log.debug("dropped event for %s", peer)
+
+    def _fanout(self, channel: str, event: dict) -> None:
+        with self._lock:
+            subs = list(self._subscribers.get(channel, ()))
+        for q in subs:
+            try:
+                q.put_nowait(event)
+            except queue.Full:
+                pass
+
+    def _ensure_listener(self) -> None:
+        # bind lazily and per pid, so nothing leaks across a fork
+        if self._socket_dir is None or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._socket_dir.mkdir(parents=True, exist_ok=True)
+            path = self._socket_dir / f"{os.getpid()}.sock"
+            path.unlink(missing_ok=True)
+            listener = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            listener.bind(str(path))
+            self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self._sender.setblocking(False)
+            self._sock_path, self._pid = path, os.getpid()
+            threading.Thread(
+                target=self._listen, args=(listener,), name="event-listener",
+                daemon=True).start()
+
+    def _listen(self, listener: socket.socket) -> None:
+        while True:
+            try:
+                message = json.loads(listener.recv(65536))
+            except OSError:
+                log.exception("event listener stopped")
+                return
+            except ValueError:
+                continue
+            self._fanout(message["channel"], message["event"])
+
+
+events = EventBroker()
+
+
+def event_stream(channel: str, view: Callable[[dict], dict | None] = lambda e: e) -> Response:
+    """
+    Server-sent events response for a channel. Events are sent with their
+    `type` as the SSE event name; comments keep idle connections alive.
+    `view` maps each event to what this subscriber may see, or None to
+    skip it.
+    """
+    heartbeat = current_app.config["EVENTS_HEARTBEAT"]
+    # the stream outlives the request; don't pin a pooled connection to it
+    db.session.close()
+
+    def generate():
+        with events.subscribe(channel) as q:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    event = q.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                event = view(event)
+                if event is not None:
+                    yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+    return Response(
+        generate(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -33,10 +33,16 @@ class Album(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     images = db.relationship("Image", backref="album", cascade="all, delete")
+    stats = db.relationship(
+        "AlbumStats", uselist=False, cascade="all, delete")
 
     @property
     def dir_path(self) -> Path:
-        return Config.STORAGE_PATH / f"album_{self.id}"
+        return self.dir_for(self.id)
+
+    @staticmethod
+    def dir_for(album_id: int) -> Path:
+        return Config.STORAGE_PATH / f"album_{album_id}"
 
 
 class Image(db.Model):
@@ -44,19 +50,145 @@ class Image(db.Model):
     filename = db.Column(db.String(256), nullable=False)
     original_name = db.Column(db.String(256), nullable=False)
     status = db.Column(db.String(50), default='approved', nullable=False)
-    album_id = db.Column(db.Integer, db.ForeignKey("album.id"), nullable=False)
+    album_id = db.Column(
+        db.Integer, db.ForeignKey("album.id"), nullable=False, index=True)
     uploader_id = db.Column(
         db.Integer, db.ForeignKey("user.id"), nullable=False)
     file_size = db.Column(db.Integer, nullable=False)
+    # size as uploaded; differs from file_size when metadata was stripped
+    original_size = db.Column(db.Integer)
+    # of the stored file, checked by `flask storage-scrub --verify`
+    sha256 = db.Column(db.String(64))
     upload_date = db.Column(db.DateTime, default=datetime.utcnow)
+    # denormalized, kept in step with the comment table by add_comment
+    comment_count = db.Column(
+        db.Integer, default=0, server_default="0", nullable=False)
+    # perceptual (difference) hash as 16 hex digits, see utils.dhash
+    phash = db.Column(db.String(16))
 
     comments = db.relationship(
         "Comment", backref="image", cascade="all, delete")
 
 
+class AlbumStats(db.Model):
+    """
+    Precomputed figures for list_albums. Counts, bytes and dates cover
+    approved images only, except pending_count. Every write that changes an
+    album's images calls refresh() before committing.
+    """
+    album_id = db.Column(
+        db.Integer, db.ForeignKey("album.id"), primary_key=True)
+    # newest approved image; no foreign key, images are bulk deleted
+    cover_image_id = db.Column(db.Integer)
+    approved_count = db.Column(
+        db.Integer, default=0, server_default="0", nullable=False)
+    pending_count = db.Column(
+        db.Integer, default=0, server_default="0", nullable=False)
+    total_bytes = db.Column(
+        db.BigInteger, default=0, server_default="0", nullable=False)
+    last_upload_at = db.Column(db.DateTime)
+
+    @classmethod
+    def refresh(cls, *album_ids: int) -> None:
+        """
+        Recompute the stats of the given albums from the image table.
+
+        The rows are locked first, so of two concurrent writers the second
+        waits and then aggregates with the first one's images committed.
+        """
+        ids = sorted(set(album_ids))
+        if not ids:
+            return
+        db.session.flush()
+        rows = {s.album_id: s for s in (
+            cls.query.filter(cls.album_id.in_(ids))
+            .order_by(cls.album_id).with_for_update().populate_existing()
+        )}
+        approved = Image.status == 'approved'
+        figures = {r.album_id: r for r in db.session.query(
+            Image.album_id,
+            db.func.max(db.case((approved, Image.id))).label("cover_image_id"),
+            db.func.count(db.case((approved, 1))).label("approved_count"),
+            db.func.count(db.case((Image.status == 'pending', 1))).label("pending_count"),
+            db.func.coalesce(db.func.sum(db.case((approved, Image.file_size))), 0).label("total_bytes"),
+            db.func.max(db.case((approved, Image.upload_date))).label("last_upload_at"),
+        ).filter(Image.album_id.in_(ids)).group_by(Image.album_id)}
+
+        for album_id in ids:
+            stats = rows.get(album_id)
+            if stats is None:
+                stats = cls(album_id=album_id)
+                db.session.add(stats)
+            r = figures.get(album_id)
+            stats.cover_image_id = r.cover_image_id if r else None
+            stats.approved_count = r.approved_count if r else 0
+            stats.pending_count = r.pending_count if r else 0
+            stats.total_bytes = r.total_bytes if r else 0
+            stats.last_upload_at = r.last_upload_at if r else None
+
+
 class Comment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    image_id = db.Column(db.Integer, db.ForeignKey("image.id"), nullable=False)
+    image_id = db.Column(
+        db.Integer, db.ForeignKey("image.id"), nullable=False, index=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
     content = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+# any constant, shared by every writer of the change log
+_CHANGE_LOG_LOCK = 0x5F0C4A9E
+
+
+class Change(db.Model):
+    """
+    Append-only change log behind /api/sync; the id is the sync token.
+    op is 'insert', 'update' or 'delete'; entity is 'album', 'image' or
+    'comment'.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(16), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+    album_id = db.Column(db.Integer, nullable=False)
+    op = db.Column(db.String(8), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @staticmethod
+    def _serialize() -> None:
+        # Postgres assigns ids at INSERT, but transactions may commit out of
+        # order and a sync could move its token past an id that commits
+        # later. Holding this lock until commit makes ids commit in order;
+        # SQLite already runs one writer at a time.
+        if db.session.get_bind().dialect.name == "postgresql":
+            db.session.execute(
+                db.text("SELECT pg_advisory_xact_lock(:key)"),
+                {"key": _CHANGE_LOG_LOCK})
+
+    @classmethod
+    def record(cls, entity: str, op: str, entity_id: int, album_id: int) -> None:
+        cls._serialize()
+        db.session.add(
+            cls(entity=entity, op=op, entity_id=entity_id, album_id=album_id))
+
+    @classmethod
+    def record_many(cls, entity: str, op: str, album_of: dict[int, int]) -> None:
+        """Log one change per {entity_id: album_id} item in a single INSERT."""
+        if album_of:
+            cls._serialize()
+            db.session.execute(db.insert(cls), [
+                {"entity": entity, "op": op, "entity_id": entity_id,
+                 "album_id": album_id, "created_at": datetime.utcnow()}
+                for entity_id, album_id in album_of.items()
+            ])
+
+    @classmethod
+    def record_comments(cls, op: str, image_ids) -> None:
+        """
+        Log `op` for every comment on the given images: 'update' when they
+        become visible to consumers, 'delete' before they are cascaded away.
+        """
+        cls.record_many("comment", op, dict(
+            db.session.query(Comment.id, Image.album_id)
+            .join(Image, Comment.image_id == Image.id)
+            .filter(Comment.image_id.in_(list(image_ids)))
+        ))
@@ -0,0 +1,124 @@
+import sys
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+# upper bounds (seconds) of the checkout wait histogram
+WAIT_BUCKETS = (0.001, 0.01, 0.1, 1.0, float("inf"))
+
+
+class PoolMetrics:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.histogram = [0] * len(WAIT_BUCKETS)
+
+    def record(self, waited: float, timed_out: bool) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+            for i, bound in enumerate(WAIT_BUCKETS):
+                if waited <= bound:
+                    self.histogram[i] += 1
+                    break
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            n = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": round(self.wait_total / n * 1000, 3) if n else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+                # waits up to le_ms (null: longer than the last bound)
+                "wait_histogram": [
+                    {"le_ms": bound * 1000 if bound != float("inf") else None, "count": count}
+                    for bound, count in zip(WAIT_BUCKETS, self.histogram)
+                ],
+            }
+
+
+class MeteredQueuePool(QueuePool):
+    """
+    QueuePool that times every checkout, i.e. how long a request waited for
+    a connection (including opening a new one). Metrics are per worker
+    process and start over when the pool is recreated.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.metrics.record(time.perf_counter() - start, timed_out=False)
+        return conn
+
+    def stats(self) -> dict:
+        limit = self.size() + self._max_overflow if self._max_overflow >= 0 else None
+        checked_out = self.checkedout()
+        return {
+            "size": self.size(),
+            "max_overflow": self._max_overflow,
+            "timeout": self._timeout,
+            "checked_out": checked_out,
+            "checked_in": self.checkedin(),
+            "overflow": max(self.overflow(), 0),
+            "saturation": round(checked_out / limit, 3) if limit else None,
+            **self.metrics.snapshot(),
+        }
+
+
+def normalize_url(url: str) -> str:
+    """Map postgres:// (as handed out by most hosts) to the psycopg2 driver."""
+    for prefix in ("postgres://", "postgresql://"):
+        if url.startswith(prefix):
+            return "postgresql+psycopg2://" + url[len(prefix):]
+    return url
+
+
+def engine_options(url: str, pool_size: int, max_overflow: int,
+                   timeout: float, recycle: int) -> dict:
+    if url.startswith("sqlite"):
+        if url in ("sqlite://", "sqlite:///:memory:"):
+            return {}  # one shared connection, nothing to meter
+        return {"poolclass": MeteredQueuePool}
+    return {
+        "poolclass": MeteredQueuePool,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": timeout,
+        "pool_recycle": recycle,
+        "pool_pre_ping": True,
+    }
+
+
+def make_psycopg_green() -> bool:
+    """
+    Under the gevent worker, make psycopg2 wait on the hub instead of
+    blocking the whole process while a query runs. Returns whether it did.
+    """
+    if "gevent" not in sys.modules:
+        return False
+    from gevent import monkey
+
+    if not monkey.is_module_patched("socket"):
+        return False
+    from psycogreen.gevent import patch_psycopg  # see requirements-postgres.txt
+
+    patch_psycopg()
+    return True
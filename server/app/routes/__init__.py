@@ -3,8 +3,14 @@ def register_blueprints(app):
     from .auth import bp as auth_bp
     from .comments import bp as comments_bp
     from .images import bp as images_bp
+    from .metrics import bp as metrics_bp
+    from .search import bp as search_bp
+    from .sync import bp as sync_bp
 
     app.register_blueprint(auth_bp)
     app.register_blueprint(albums_bp)
     app.register_blueprint(images_bp)
     app.register_blueprint(comments_bp)
+    app.register_blueprint(search_bp)
+    app.register_blueprint(sync_bp)
+    app.register_blueprint(metrics_bp)
@@ -1,13 +1,17 @@
 from flask import Blueprint, g, jsonify, request
 
+from .. import search, signing
 from ..auth import admin_required, login_required
-from ..models import Album, db
+from ..cache import cached_listing, response_cache
+from ..events import event_stream
+from ..models import Album, AlbumStats, Change, Image, UserRole, db
 
 bp = Blueprint("albums", __name__, url_prefix="/api/albums")
 
 
 @bp.get("/")
 @login_required
+@cached_listing(lambda: "albums")
 def list_albums():
     """
     List All Albums
@@ -22,9 +26,78 @@ def list_albums():
     responses:
       200:
         description: A list of albums.
+        content:
+          application/json:
+            schema:
+              type: object
+              properties:
+                albums:
+                  type: array
+                  items:
+                    type: object
+                    properties:
+                      id:
+                        type: integer
+                        example: 1
+                      name:
+                        type: string
+                        example: "Summer Camp 2024"
+                      cover:
+                        type: object
+                        nullable: true
+                        description: The newest approved image.
+                        properties:
+                          id:
+                            type: integer
+                            example: 42
+                          filename:
+                            type: string
+                            example: "image42.jpg"
+                          url:
+                            type: string
+                            example: "/api/images/a/1/image42.jpg?e=1720987200&s=..."
+                      approved_count:
+                        type: integer
+                        example: 120
+                      pending_count:
+                        type: integer
+                        description: Admins only.
+                        example: 3
+                      total_bytes:
+                        type: integer
+                        description: Size of the approved images.
+                        example: 251658240
+                      last_upload_at:
+                        type: string
+                        nullable: true
+                        example: "2024-07-14T18:03:11"
     """
-    albums = Album.query.order_by(Album.created_at.desc()).all()
-    return jsonify(albums=[{"id": a.id, "name": a.name} for a in albums])
+    admin = g.current_user.role == UserRole.ADMIN
+    rows = (
+        db.session.query(Album, AlbumStats, Image)
+        .outerjoin(AlbumStats, AlbumStats.album_id == Album.id)
+        .outerjoin(Image, Image.id == AlbumStats.cover_image_id)
+        .order_by(Album.created_at.desc()).all()
+    )
+    albums = []
+    for album, stats, cover in rows:
+        entry = {
+            "id": album.id,
+            "name": album.name,
+            "cover": {
+                "id": cover.id,
+                "filename": cover.filename,
+                "url": signing.image_url(cover.album_id, cover.filename),
+            } if cover else None,
+            "approved_count": stats.approved_count if stats else 0,
+            "total_bytes": stats.total_bytes if stats else 0,
+            "last_upload_at": stats.last_upload_at.isoformat()
+            if stats and stats.last_upload_at else None,
+        }
+        if admin:
+            entry["pending_count"] = stats.pending_count if stats else 0
+        albums.append(entry)
+    return jsonify(albums=albums)
 
 
 @bp.post("/")
@@ -60,7 +133,55 @@ def create_album():
     name = (request.get_json(force=True).get("name") or "").strip()
     if not name:
         return jsonify(error="name required"), 400
-    album = Album(name=name, owner_id=g.current_user.id)
+    album = Album(name=name, owner_id=g.current_user.id, stats=AlbumStats())
     db.session.add(album)
+    db.session.flush()
+    search.index_album(album)
+    Change.record("album", "insert", album.id, album.id)
     db.session.commit()
+    response_cache.bump("albums")
     return jsonify(success=True, album={"id": album.id, "name": album.name})
+
+
+def _consumer_view(event: dict) -> dict | None:
+    """An album event as a consumer may see it: nothing about pending images."""
+    if event["type"] == "moderate":
+        # of the rejected ids, only images that were approved are news
+        rejected = event["rejected_approved"]
+        if not event["approved"] and not rejected:
+            return None
+        return {"type": "moderate", "album_id": event["album_id"],
+                "approved": event["approved"], "rejected": rejected}
+    return event if event.get("status") != 'pending' else None
+
+
+@bp.get("/<int:album_id>/events")
+@login_required
+def album_events(album_id):
+    """
+    Album Event Stream
+    Server-sent events for uploads, approvals and rejections in an album,
+    pushed as they happen instead of polling the image listing.
+    Consumers only receive events about approved images; in their moderate
+    events `rejected` only lists images that had been approved.
+    ---
+    tags:
+      - Albums
+    security:
+      - ApiKeyAuth: []
+    parameters:
+      - $ref: '#/components/parameters/usernameHeader'
+      - in: path
+        name: album_id
+        type: integer
+        required: true
+    responses:
+      200:
+        description: A text/event-stream of upload, approve, reject and moderate events.
+      404:
+        description: Album not found.
+    """
+    Album.query.get_or_404(album_id)
+    if g.current_user.role == UserRole.CONSUMER:
+        return event_stream(f"album:{album_id}", _consumer_view)
+    return event_stream(f"album:{album_id}")
@@ -1,7 +1,10 @@
 from flask import Blueprint, g, jsonify, request
+from sqlalchemy import func
 
+from .. import search
 from ..auth import login_required
-from ..models import Comment, Image, db
+from ..cache import response_cache
+from ..models import Change, Comment, Image, db
 
 bp = Blueprint("comments", __name__, url_prefix="/api/comments")
 
@@ -60,9 +63,20 @@ def add_comment():
     if not content:
         return jsonify(error="content required"), 400
 
+    # the change-log lock comes before the comment's insert locks the image
+    # row, the same order moderate_images takes them in
+    Change._serialize()
     c = Comment(image=image, author=g.current_user, content=content)
     db.session.add(c)
+    db.session.flush()
+    search.index_comment(c)
+    Change.record("comment", "insert", c.id, image.album_id)
+    Image.query.filter_by(id=image.id).update(
+        {Image.comment_count: Image.comment_count + 1},
+        synchronize_session=False)
+    Change.record("image", "update", image.id, image.album_id)
     db.session.commit()
+    response_cache.bump(f"album:{image.album_id}")
     return jsonify(success=True, comment_id=c.id)
 
 
@@ -124,3 +138,55 @@ def list_comments(image_id):
             for c in image.comments
         ]
     )
+
+
+@bp.get("/counts")
+@login_required
+def comment_counts():
+    """
+    Comment Counts for Many Images
+    Returns the number of comments for each requested image in one call.
+    ---
+    tags:
+      - Comments
+    security:
+      - ApiKeyAuth: []
+    parameters:
+      - $ref: '#/components/parameters/usernameHeader'
+      - in: query
+        name: image_ids
+        type: string
+        required: true
+        description: Comma separated image ids (at most 500).
+        example: "1,2,3"
+    responses:
+      400:
+        description: Missing or malformed image_ids.
+      200:
+        description: Comment count per image id.
+        content:
+          application/json:
+            schema:
+              type: object
+              properties:
+                counts:
+                  type: object
+                  additionalProperties:
+                    type: integer
+                  example: {"1": 3, "2": 0}
+    """
+    try:
+        image_ids = {int(i) for i in request.args.get("image_ids", "").split(",") if i}
+    except ValueError:
+        return jsonify(error="image_ids must be comma separated integers"), 400
+    if not image_ids or len(image_ids) > 500:
+        return jsonify(error="between 1 and 500 image_ids required"), 400
+
+    rows = (
+        db.session.query(Comment.image_id, func.count(Comment.id))
+        .filter(Comment.image_id.in_(image_ids))
+        .group_by(Comment.image_id)
+    )
+    counts = dict.fromkeys(image_ids, 0)
+    counts.update(rows)
+    return jsonify(counts={str(k): v for k, v in counts.items()})
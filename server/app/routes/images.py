@@ -1,20 +1,38 @@
 import base64
 import uuid
 from datetime import datetime
+from itertools import groupby
 from pathlib import Path
 
-from flask import Blueprint, g, jsonify, request, send_file
+from flask import Blueprint, Response, current_app, g, jsonify, request
 from werkzeug.utils import secure_filename
 
+from .. import search, signing
+from ..admission import upload_admission
 from ..auth import admin_required, login_required
-from ..models import Album, Image, UserRole, db
-from ..utils import save_image
+from ..cache import cached_listing, response_cache
+from ..dedup import cluster
+from ..events import event_stream, events
+from ..models import Album, AlbumStats, Change, Comment, Image, User, UserRole, db
+from ..tasks import queue_file_deletions
+from ..utils import dhash, render_contact_sheet, save_image, send_image_file
 
 bp = Blueprint("images", __name__, url_prefix="/api/images")
 
 
+def _publish_image_event(kind: str, img: Image, status: str) -> None:
+    event = {
+        "type": kind, "album_id": img.album_id, "image_id": img.id,
+        "filename": img.filename, "status": status,
+    }
+    events.publish(f"album:{img.album_id}", event)
+    if kind != "upload" or status == 'pending':
+        events.publish("pending", event)
+
+
 @bp.post("/upload")
 @login_required
+@upload_admission
 def upload_image():
     """
     Upload an Image
@@ -56,6 +74,8 @@ def upload_image():
                   example: "Image uploaded successfully."
       404:
         description: Album not found.
+      429:
+        description: Upload rate limit exceeded or too many uploads in progress; see Retry-After.
     """
     file = request.files.get("image")
     album_id = request.form.get("album_id")
@@ -65,22 +85,39 @@ def upload_image():
     album = Album.query.get_or_404(int(album_id))
     original = secure_filename(file.filename or "image.bin")
     image_bytes = file.read()
-    fname, size = save_image(album.dir_path, original, image_bytes)
+    fname, size, sha256 = save_image(
+        album.dir_path, original, image_bytes,
+        strip_metadata=current_app.config["STRIP_METADATA"],
+        keep_original=current_app.config["KEEP_ORIGINALS"],
+    )
+
+    try:
+        phash = dhash(image_bytes)
+    except (OSError, ValueError):
+        phash = None
 
     status = 'approved' if g.current_user.role == UserRole.ADMIN else 'pending'
 
     img = Image(
         filename=fname, original_name=original, album=album,
-        uploader_id=g.current_user.id, file_size=size, status=status
+        uploader_id=g.current_user.id, file_size=size, status=status,
+        original_size=len(image_bytes), sha256=sha256, phash=phash,
     )
     db.session.add(img)
+    db.session.flush()
+    search.index_image(img)
+    Change.record("image", "insert", img.id, album.id)
+    AlbumStats.refresh(album.id)
     db.session.commit()
+    response_cache.bump("albums", f"album:{album.id}")
+    _publish_image_event("upload", img, status)
     message = "Image uploaded successfully." if status == 'approved' else "Image submitted for approval."
     return jsonify(success=True, message=message, data={"image_id": img.id, "filename": img.filename})
 
 
 @bp.get("/album/<int:album_id>")
 @login_required
+@cached_listing(lambda album_id: f"album:{album_id}")
 def list_album_images(album_id):
     """
     List Images in an Album
@@ -116,19 +153,168 @@ def list_album_images(album_id):
                       filename:
                         type: string
                         example: "image1.jpg"
+                      url:
+                        type: string
+                        description: Signed URL of the file, valid for at least IMAGE_URL_TTL seconds.
+                        example: "/api/images/a/1/image1.jpg?e=1720987200&s=..."
+                      comment_count:
+                        type: integer
+                        example: 2
     """
     query = Image.query.filter_by(album_id=album_id)
     if g.current_user.role == UserRole.CONSUMER:
         query = query.filter_by(status='approved')
     images = query.order_by(Image.upload_date.desc()).all()
-    return jsonify(images=[{"id": i.id, "filename": i.filename} for i in images])
+    return jsonify(images=[
+        {
+            "id": i.id,
+            "filename": i.filename,
+            "url": signing.image_url(i.album_id, i.filename),
+            "comment_count": i.comment_count,
+        }
+        for i in images
+    ])
+
+
+@bp.get("/album/<int:album_id>/duplicates")
+@login_required
+@admin_required
+def album_duplicates(album_id):
+    """
+    Near-Duplicate Clusters in an Album (Admin Only)
+    Groups images whose perceptual hashes differ in at most `distance` bits,
+    e.g. burst shots. Images without a hash are ignored.
+    ---
+    tags:
+      - Images (Admin)
+    security:
+      - ApiKeyAuth: []
+    parameters:
+      - $ref: '#/components/parameters/usernameHeader'
+      - in: path
+        name: album_id
+        type: integer
+        required: true
+      - in: query
+        name: distance
+        type: integer
+        required: false
+        description: Maximum Hamming distance between neighbours (0-16, default 6).
+    responses:
+      200:
+        description: Clusters of near-duplicate images, oldest upload first.
+        content:
+          application/json:
+            schema:
+              type: object
+              properties:
+                clusters:
+                  type: array
+                  items:
+                    type: array
+                    items:
+                      type: object
+                      properties:
+                        id:
+                          type: integer
+                          example: 1
+                        filename:
+                          type: string
+                          example: "image1.jpg"
+                        status:
+                          type: string
+                          example: "pending"
+      404:
+        description: Album not found.
+    """
+    Album.query.get_or_404(album_id)
+    distance = min(max(request.args.get("distance", 6, type=int), 0), 16)
+    images = (
+        Image.query.filter(Image.album_id == album_id, Image.phash.isnot(None))
+        .order_by(Image.upload_date, Image.id)
+    )
+    clusters = cluster(((int(i.phash, 16), i) for i in images), distance)
+    clusters.sort(key=lambda group: group[0].upload_date)
+    return jsonify(clusters=[
+        [
+            {
+                "id": i.id,
+                "filename": i.filename,
+                "url": signing.image_url(i.album_id, i.filename),
+                "status": i.status,
+                "upload_date": i.upload_date.isoformat(),
+            }
+            for i in group
+        ]
+        for group in clusters
+    ])
+
+
+@bp.get("/a/<int:album_id>/<filename>")
+def serve_signed_image(album_id, filename):
+    """
+    Serve an Image File by Signed URL
+    Serves the raw image file behind a `url` from any listing. The signature
+    is checked without touching the database, so this works for pending
+    images too. Supports conditional requests and single byte ranges
+    (Range / If-Range), so interrupted downloads can resume.
+    ---
+    tags:
+      - Images
+    parameters:
+      - in: path
+        name: album_id
+        type: integer
+        required: true
+      - in: path
+        name: filename
+        type: string
+        required: true
+      - in: query
+        name: e
+        type: integer
+        required: true
+        description: Expiry time (unix seconds).
+      - in: query
+        name: s
+        type: string
+        required: true
+        description: Signature.
+    responses:
+      200:
+        description: The image file.
+      206:
+        description: The requested byte range of the image file.
+      304:
+        description: Not modified.
+      403:
+        description: Invalid or expired signature.
+      404:
+        description: Image not found.
+      416:
+        description: Range not satisfiable (including multi-range requests).
+    """
+    remaining = signing.verify(
+        album_id, filename, request.args.get("e", ""), request.args.get("s", ""))
+    if remaining is None:
+        return jsonify(error="Invalid or expired link"), 403
+    rv = send_image_file(Album.dir_for(album_id) / filename)
+    # stored files never change, but the URL stops working at expiry
+    rv.cache_control.no_cache = None
+    rv.cache_control.private = True
+    rv.cache_control.max_age = remaining
+    return rv
 
 
 @bp.get("/<path:filename>")
 def serve_image(filename):
     """
     Serve an Image File
-    Serves the raw image file. This endpoint is public and does not require authentication.
+    Serves the raw file of an approved image. This endpoint is public and
+    does not require authentication; prefer the signed `url` of listings,
+    which skips the database lookup. Supports conditional requests and
+    single byte ranges (Range / If-Range), so interrupted downloads can
+    resume.
     ---
     tags:
       - Images
@@ -147,12 +333,18 @@ def serve_image(filename):
           image/png:
             schema:
               format: binary
+      206:
+        description: The requested byte range of the image file.
+      304:
+        description: Not modified.
       404:
-        description: Image not found.
+        description: Image not found or not approved.
+      416:
+        description: Range not satisfiable (including multi-range requests).
     """
-    img = Image.query.filter_by(filename=filename).first_or_404()
+    img = Image.query.filter_by(filename=filename, status='approved').first_or_404()
     path = img.album.dir_path / filename
-    return send_file(path)
+    return send_image_file(path)
 
 
 @bp.get("/pending")
@@ -188,9 +380,203 @@ def list_pending():
                       filename:
                         type: string
                         example: "image1.jpg"
+                      url:
+                        type: string
+                        example: "/api/images/a/1/image1.jpg?e=1720987200&s=..."
     """
     pending = Image.query.filter_by(status='pending').all()
-    return jsonify(images=[{"id": i.id, "filename": i.filename} for i in pending])
+    return jsonify(images=[
+        {"id": i.id, "filename": i.filename, "url": signing.image_url(i.album_id, i.filename)}
+        for i in pending
+    ])
+
+
+def _pending_page(max_per_page: int):
+    """
+    Paginate pending images ordered so that each album/uploader pair is
+    contiguous. Honors the `album_id`, `page` and `per_page` query args.
+    """
+    query = Image.query.filter_by(status='pending')
+    album_id = request.args.get("album_id", type=int)
+    if album_id is not None:
+        query = query.filter_by(album_id=album_id)
+    query = query.order_by(
+        Image.album_id, Image.uploader_id, Image.upload_date, Image.id)
+    return query.paginate(
+        page=request.args.get("page", 1, type=int),
+        per_page=request.args.get("per_page", max_per_page, type=int),
+        max_per_page=max_per_page,
+        error_out=False,
+    )
+
+
+@bp.get("/pending/queue")
+@login_required
+@admin_required
+def moderation_queue():
+    """
+    Moderation Queue (Admin Only)
+    Pending images grouped by album and uploader, paginated.
+    ---
+    tags:
+      - Images (Admin)
+    security:
+      - ApiKeyAuth: []
+    parameters:
+      - $ref: '#/components/parameters/usernameHeader'
+      - in: query
+        name: album_id
+        type: integer
+        required: false
+      - in: query
+        name: page
+        type: integer
+        required: false
+      - in: query
+        name: per_page
+        type: integer
+        required: false
+        description: Images per page (max 100).
+    responses:
+      200:
+        description: One page of the moderation queue.
+        content:
+          application/json:
+            schema:
+              type: object
+              properties:
+                groups:
+                  type: array
+                  items:
+                    type: object
+                    properties:
+                      album:
+                        type: object
+                      uploader:
+                        type: object
+                      images:
+                        type: array
+                        items:
+                          type: object
+                page:
+                  type: integer
+                  example: 1
+                pages:
+                  type: integer
+                  example: 5
+                total:
+                  type: integer
+                  example: 420
+    """
+    page = _pending_page(max_per_page=100)
+    album_ids = {i.album_id for i in page.items}
+    uploader_ids = {i.uploader_id for i in page.items}
+    albums = {a.id: a for a in Album.query.filter(Album.id.in_(album_ids))}
+    uploaders = {u.id: u for u in User.query.filter(User.id.in_(uploader_ids))}
+
+    groups = []
+    for (album_id, uploader_id), images in groupby(
+            page.items, key=lambda i: (i.album_id, i.uploader_id)):
+        groups.append({
+            "album": {"id": album_id, "name": albums[album_id].name},
+            "uploader": {
+                "id": uploader_id,
+                "username": uploaders[uploader_id].username,
+            },
+            "images": [
+                {
+                    "id": i.id,
+                    "filename": i.filename,
+                    "url": signing.image_url(i.album_id, i.filename),
+                    "original_name": i.original_name,
+                    "file_size": i.file_size,
+                    "upload_date": i.upload_date.isoformat(),
+                }
+                for i in images
+            ],
+        })
+    return jsonify(groups=groups, page=page.page, pages=page.pages, total=page.total)
+
+
+@bp.get("/pending/contact-sheet")
+@login_required
+@admin_required
+def moderation_contact_sheet():
+    """
+    Moderation Contact Sheet (Admin Only)
+    Renders one page of the moderation queue as a single JPEG grid of
+    thumbnails, in the same order as /pending/queue. The ids of the tiles
+    are returned in the X-Image-Ids header, left to right, top to bottom.
+    ---
+    tags:
+      - Images (Admin)
+    security:
+      - ApiKeyAuth: []
+    parameters:
+      - $ref: '#/components/parameters/usernameHeader'
+      - in: query
+        name: album_id
+        type: integer
+        required: false
+      - in: query
+        name: page
+        type: integer
+        required: false
+      - in: query
+        name: per_page
+        type: integer
+        required: false
+        description: Tiles per sheet (max 60).
+      - in: query
+        name: columns
+        type: integer
+        required: false
+      - in: query
+        name: tile
+        type: integer
+        required: false
+        description: Tile edge in pixels (64-320).
+    responses:
+      200:
+        description: The contact sheet.
+        content:
+          image/jpeg:
+            schema:
+              format: binary
+    """
+    page = _pending_page(max_per_page=60)
+    columns = min(max(request.args.get("columns", 6, type=int), 1), 12)
+    tile = min(max(request.args.get("tile", 160, type=int), 64), 320)
+    sheet = render_contact_sheet(
+        [Album.dir_for(i.album_id) / i.filename for i in page.items],
+        tile=tile, columns=columns,
+    )
+    resp = Response(sheet, mimetype="image/jpeg")
+    resp.headers["X-Image-Ids"] = ",".join(str(i.id) for i in page.items)
+    resp.headers["X-Total-Count"] = str(page.total)
+    return resp
+
+
+@bp.get("/pending/events")
+@login_required
+@admin_required
+def pending_events():
+    """
+    Moderation Event Stream (Admin Only)
+    Server-sent events for pending uploads and approve / reject /
+    moderate actions across all albums.
+    ---
+    tags:
+      - Images (Admin)
+    security:
+      - ApiKeyAuth: []
+    parameters:
+      - $ref: '#/components/parameters/usernameHeader'
+    responses:
+      200:
+        description: A text/event-stream of upload, approve, reject and moderate events.
+    """
+    return event_stream("pending")
 
 
 @bp.post("/<int:image_id>/approve")
@@ -225,7 +611,12 @@ def approve_image(image_id):
     """
     img = Image.query.get_or_404(image_id)
     img.status = 'approved'
+    Change.record("image", "update", img.id, img.album_id)
+    Change.record_comments("update", [img.id])
+    AlbumStats.refresh(img.album_id)
     db.session.commit()
+    response_cache.bump("albums", f"album:{img.album_id}")
+    _publish_image_event("approve", img, 'approved')
     return jsonify(success=True)
 
 
@@ -260,7 +651,140 @@ def reject_image(image_id):
                   example: true
     """
     img = Image.query.get_or_404(image_id)
+    album_id, status = img.album_id, img.status
     (img.album.dir_path / img.filename).unlink(missing_ok=True)
+    (img.album.dir_path / "originals" / img.filename).unlink(missing_ok=True)
+    search.remove_images([img.id])
+    Change.record("image", "delete", img.id, album_id)
+    Change.record_comments("delete", [img.id])
     db.session.delete(img)
+    AlbumStats.refresh(album_id)
     db.session.commit()
+    response_cache.bump("albums", f"album:{album_id}")
+    _publish_image_event("reject", img, status)
     return jsonify(success=True)
+
+
+def _id_set(value) -> set[int] | None:
+    """A JSON list of ids as a set; None unless it is a list of integers."""
+    if value is None:
+        return set()
+    if not isinstance(value, list) or not all(
+            isinstance(i, int) and not isinstance(i, bool) for i in value):
+        return None
+    return set(value)
+
+
+@bp.post("/moderate")
+@login_required
+@admin_required
+def moderate_images():
+    """
+    Bulk Approve / Reject Images (Admin Only)
+    Approves and rejects many images in a single request.
+    Status changes are applied in one UPDATE and one DELETE; the files of
+    rejected images are removed in the background.
+    ---
+    tags:
+      - Images (Admin)
+    security:
+      - ApiKeyAuth: []
+    parameters:
+      - $ref: '#/components/parameters/usernameHeader'
+    requestBody:
+        required: true
+        content:
+          application/json:
+            schema:
+              type: object
+              properties:
+                approve:
+                  type: array
+                  items:
+                    type: integer
+                  example: [1, 2, 3]
+                reject:
+                  type: array
+                  items:
+                    type: integer
+                  example: [4, 5]
+    responses:
+      200:
+        description: Images moderated.
+        content:
+          application/json:
+            schema:
+              type: object
+              properties:
+                success:
+                  type: boolean
+                  example: true
+                approved:
+                  type: integer
+                  example: 3
+                rejected:
+                  type: integer
+                  example: 2
+      400:
+        description: Invalid id lists.
+    """
+    data = request.get_json(force=True)
+    approve_ids = _id_set(data.get("approve")) if isinstance(data, dict) else None
+    reject_ids = _id_set(data.get("reject")) if isinstance(data, dict) else None
+    if approve_ids is None or reject_ids is None:
+        return jsonify(error="approve and reject must be lists of image ids"), 400
+    if approve_ids & reject_ids:
+        return jsonify(error="an image cannot be both approved and rejected"), 400
+
+    # take the change-log lock before any row lock, in the order add_comment
+    # does, so the two cannot deadlock on Postgres
+    Change._serialize()
+    rows = db.session.query(Image.id, Image.album_id, Image.status).filter(
+        Image.id.in_(approve_ids | reject_ids)).all()
+    album_of = {i: album_id for i, album_id, _ in rows}
+    # rejecting these removes images consumers could already see
+    public = {i for i, _, status in rows if status == 'approved'}
+
+    approved = 0
+    if approve_ids:
+        approved = Image.query.filter(Image.id.in_(approve_ids)).update(
+            {Image.status: 'approved'}, synchronize_session=False)
+        Change.record_many("image", "update", {
+            i: album_of[i] for i in approve_ids if i in album_of})
+        Change.record_comments("update", approve_ids)
+
+    doomed = []
+    if reject_ids:
+        doomed = db.session.query(Image.album_id, Image.filename).filter(
+            Image.id.in_(reject_ids)).all()
+        Change.record_comments("delete", reject_ids)
+        Comment.query.filter(Comment.image_id.in_(reject_ids)).delete(
+            synchronize_session=False)
+        Image.query.filter(Image.id.in_(reject_ids)).delete(
+            synchronize_session=False)
+        search.remove_images(reject_ids)
+        Change.record_many("image", "delete", {
+            i: album_of[i] for i in reject_ids if i in album_of})
+
+    AlbumStats.refresh(*album_of.values())
+    db.session.commit()
+    if album_of:
+        response_cache.bump(
+            "albums", *{f"album:{album_id}" for album_id in album_of.values()})
+    for album_id in set(album_of.values()):
+        event = {
+            "type": "moderate", "album_id": album_id,
+            "approved": sorted(i for i in approve_ids if album_of.get(i) == album_id),
+            "rejected": sorted(i for i in reject_ids if album_of.get(i) == album_id),
+            "rejected_approved": sorted(
+                i for i in reject_ids & public if album_of[i] == album_id),
+        }
+        events.publish(f"album:{album_id}", event)
+        events.publish("pending", event)
+    queue_file_deletions(
+        path
+        for album_id, filename in doomed
+        for path in (Album.dir_for(album_id) / filename,
+                     Album.dir_for(album_id) / "originals" / filename)
+    )
+    return jsonify(success=True, approved=approved, rejected=len(doomed))
@@ -0,0 +1,68 @@
+from flask import Blueprint, jsonify
+
+from .. import db
+from ..auth import admin_required, login_required
+from ..pool import MeteredQueuePool
+
+bp = Blueprint("metrics", __name__, url_prefix="/api/metrics")
+
+
+@bp.get("/db")
+@login_required
+@admin_required
+def db_pool():
+    """
+    Database Pool Metrics (Admin Only)
+    Connection pool usage of the worker process that answers the request:
+    connections checked out versus the pool limit (saturation), and how
+    long checkouts waited for a connection since the pool was created.
+    ---
+    tags:
+      - Metrics (Admin)
+    security:
+      - ApiKeyAuth: []
+    parameters:
+      - $ref: '#/components/parameters/usernameHeader'
+    responses:
+      200:
+        description: Pool metrics.
+        content:
+          application/json:
+            schema:
+              type: object
+              properties:
+                dialect:
+                  type: string
+                  example: "postgresql"
+                pool:
+                  type: object
+                  properties:
+                    size:
+                      type: integer
+                      example: 10
+                    checked_out:
+                      type: integer
+                      example: 3
+                    saturation:
+                      type: number
+                      example: 0.15
+                    checkouts:
+                      type: integer
+                      example: 10234
+                    timeouts:
+                      type: integer
+                      example: 0
+                    wait_avg_ms:
+                      type: number
+                      example: 0.021
+                    wait_max_ms:
+                      type: number
+                      example: 14.2
+                    wait_histogram:
+                      type: array
+                      items:
+                        type: object
+    """
+    pool = db.engine.pool
+    stats = pool.stats() if isinstance(pool, MeteredQueuePool) else None
+    return jsonify(dialect=db.engine.dialect.name, pool=stats)
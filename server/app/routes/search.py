@@ -0,0 +1,97 @@
+from flask import Blueprint, g, jsonify, request
+
+from .. import search as search_index
+from .. import signing
+from ..auth import login_required
+from ..models import UserRole
+
+bp = Blueprint("search", __name__, url_prefix="/api/search")
+
+
+@bp.get("/")
+@login_required
+def search():
+    """
+    Search
+    Full-text search over album names, original filenames and comments.
+    Every word is matched as a prefix; results are ranked by relevance.
+    Consumers only get hits on approved images.
+    ---
+    tags:
+      - Search
+    security:
+      - ApiKeyAuth: []
+    parameters:
+      - $ref: '#/components/parameters/usernameHeader'
+      - in: query
+        name: q
+        type: string
+        required: true
+        example: "campfire"
+      - in: query
+        name: page
+        type: integer
+        required: false
+      - in: query
+        name: per_page
+        type: integer
+        required: false
+        description: Results per page (max 100).
+    responses:
+      400:
+        description: Query required.
+      200:
+        description: One page of ranked hits.
+        content:
+          application/json:
+            schema:
+              type: object
+              properties:
+                results:
+                  type: array
+                  items:
+                    type: object
+                    properties:
+                      type:
+                        type: string
+                        example: "comment"
+                      id:
+                        type: integer
+                        example: 12
+                      album_id:
+                        type: integer
+                        example: 1
+                      image_id:
+                        type: integer
+                        example: 3
+                      filename:
+                        type: string
+                        example: "20240701_201500_1a2b3c4d.jpg"
+                      url:
+                        type: string
+                        nullable: true
+                        description: Signed image URL; null for album hits.
+                      snippet:
+                        type: string
+                        example: "by the <b>campfire</b>"
+                page:
+                  type: integer
+                  example: 1
+                total:
+                  type: integer
+                  example: 42
+    """
+    q = (request.args.get("q") or "").strip()
+    if not q:
+        return jsonify(error="q required"), 400
+    page = max(request.args.get("page", 1, type=int), 1)
+    per_page = min(max(request.args.get("per_page", 20, type=int), 1), 100)
+
+    hits, total = search_index.search(
+        q, page, per_page,
+        approved_only=g.current_user.role == UserRole.CONSUMER,
+    )
+    for hit in hits:
+        hit["url"] = (signing.image_url(hit["album_id"], hit["filename"])
+                      if hit["filename"] else None)
+    return jsonify(results=hits, page=page, total=total)
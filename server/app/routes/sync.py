@@ -0,0 +1,148 @@
+from flask import Blueprint, g, jsonify, request
+from sqlalchemy.orm import joinedload
+
+from ..auth import login_required
+from ..models import Album, Change, Comment, Image, UserRole
+
+bp = Blueprint("sync", __name__, url_prefix="/api/sync")
+
+
+def _album_json(a: Album) -> dict:
+    return {"id": a.id, "name": a.name}
+
+
+def _image_json(i: Image) -> dict:
+    return {
+        "id": i.id,
+        "album_id": i.album_id,
+        "filename": i.filename,
+        "original_name": i.original_name,
+        "status": i.status,
+        "file_size": i.file_size,
+        "comment_count": i.comment_count,
+        "upload_date": i.upload_date.isoformat(),
+    }
+
+
+def _comment_json(c: Comment) -> dict:
+    return {
+        "id": c.id,
+        "image_id": c.image_id,
+        "content": c.content,
+        "author": c.author.username,
+        "created_at": c.created_at.isoformat(),
+    }
+
+
+_ENTITIES = {
+    "album": ("albums", Album, _album_json),
+    "image": ("images", Image, _image_json),
+    "comment": ("comments", Comment, _comment_json),
+}
+
+
+@bp.get("/")
+@login_required
+def sync():
+    """
+    Delta Sync
+    Returns what changed since a sync token: rows inserted or updated since
+    then (current state, one entry per row) and the ids of deleted rows.
+    Start with since=0 and keep passing the returned `next` token; repeat
+    while `has_more` is true. Treat `inserted` and `updated` both as
+    upserts: for consumers an image first shows up once it is approved.
+    ---
+    tags:
+      - Sync
+    security:
+      - ApiKeyAuth: []
+    parameters:
+      - $ref: '#/components/parameters/usernameHeader'
+      - in: query
+        name: since
+        type: integer
+        required: false
+        description: The `next` token of the previous sync, 0 for a full sync.
+      - in: query
+        name: limit
+        type: integer
+        required: false
+        description: Maximum change log entries to consume (max 1000).
+    responses:
+      400:
+        description: Invalid token.
+      200:
+        description: Changes since the token.
+        content:
+          application/json:
+            schema:
+              type: object
+              properties:
+                albums:
+                  type: object
+                  properties:
+                    inserted:
+                      type: array
+                      items:
+                        type: object
+                    updated:
+                      type: array
+                      items:
+                        type: object
+                    deleted:
+                      type: array
+                      items:
+                        type: integer
+                images:
+                  type: object
+                comments:
+                  type: object
+                next:
+                  type: string
+                  example: "1042"
+                has_more:
+                  type: boolean
+                  example: false
+    """
+    try:
+        since = int(request.args.get("since", "0"))
+    except ValueError:
+        return jsonify(error="since must be a sync token"), 400
+    limit = min(max(request.args.get("limit", 500, type=int), 1), 1000)
+
+    changes = (
+        Change.query.filter(Change.id > since)
+        .order_by(Change.id).limit(limit + 1).all()
+    )
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    # compact: first and last op per row within this window
+    first_op: dict[tuple[str, int], str] = {}
+    last_op: dict[tuple[str, int], str] = {}
+    for ch in changes:
+        first_op.setdefault((ch.entity, ch.entity_id), ch.op)
+        last_op[(ch.entity, ch.entity_id)] = ch.op
+
+    consumer = g.current_user.role == UserRole.CONSUMER
+    out = {}
+    for entity, (name, model, to_json) in _ENTITIES.items():
+        live = [eid for (e, eid), op in last_op.items() if e == entity and op != "delete"]
+        deleted = sorted(eid for (e, eid), op in last_op.items() if e == entity and op == "delete")
+        query = model.query.filter(model.id.in_(live))
+        if model is Comment:
+            query = query.options(
+                joinedload(Comment.author), joinedload(Comment.image))
+        rows = query.all() if live else []
+        if consumer and model is Image:
+            rows = [r for r in rows if r.status == 'approved']
+        elif consumer and model is Comment:
+            rows = [r for r in rows if r.image.status == 'approved']
+        out[name] = {
+            "inserted": [to_json(r) for r in rows if first_op[(entity, r.id)] == "insert"],
+            "updated": [to_json(r) for r in rows if first_op[(entity, r.id)] != "insert"],
+            "deleted": deleted,
+        }
+
+    next_token = changes[-1].id if changes else since
+    return jsonify(**out, next=str(next_token), has_more=has_more)
@@ -0,0 +1,364 @@
+import hashlib
+import json
+import os
+import queue
+import re
+import shutil
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import and_, or_, select
+
+from . import search
+from .cache import response_cache
+from .models import Album, AlbumStats, Change, Comment, Image, db
+
+_ALBUM_DIR = re.compile(r"album_(\d+)")
+# rows fetched per query, and walked entries per checkpoint
+_BATCH = 1000
+_CHECKPOINT = 1000
+
+
+class ScrubRefused(Exception):
+    def __init__(self, message: str, counts: Counter | None = None) -> None:
+        super().__init__(message)
+        self.counts = counts if counts is not None else Counter()
+
+
+@dataclass(frozen=True)
+class DiskEntry:
+    album_id: int
+    name: str
+    path: Path
+    original: bool
+
+    @property
+    def key(self) -> tuple[int, str]:
+        return self.album_id, self.name
+
+
+class RateLimiter:
+    """Token bucket over bytes read, so a scrub cannot saturate the disk."""
+
+    def __init__(self, bytes_per_sec: float) -> None:
+        self.rate = bytes_per_sec
+        self._allowance = bytes_per_sec
+        self._last = time.monotonic()
+
+    def consume(self, n: int) -> None:
+        if self.rate <= 0:
+            return
+        now = time.monotonic()
+        self._allowance = min(self.rate, self._allowance + (now - self._last) * self.rate)
+        self._last = now
+        self._allowance -= n
+        if self._allowance < 0:
+            time.sleep(-self._allowance / self.rate)
+
+
+def _prefetch(it: Iterator, size: int = 1000) -> Iterator:
+    """Run an iterator in a background thread, buffering up to `size` items."""
+    q: queue.Queue = queue.Queue(maxsize=size)
+    done = object()
+
+    def produce():
+        try:
+            for item in it:
+                q.put(item)
+        finally:
+            q.put(done)
+
+    threading.Thread(target=produce, name="scrub-walk", daemon=True).start()
+    while (item := q.get()) is not done:
+        yield item
+
+
+def _walk_storage(root: Path, album_ids: set[int], after: tuple[int, str] | None,
+                  orphan_dir: Callable[[Path, int | None], None],
+                  unreadable: Callable[[Path, int], None]) -> Iterator[DiskEntry]:
+    """
+    Yield stored files ordered like the DB stream: by album id, then file
+    name, the main file before its copy in originals/. Anything that is not
+    the directory of an existing album is reported through orphan_dir (with
+    the album id for album_<id> directories, None for foreign entries) and
+    not descended into. Album directories that cannot be listed are
+    reported through unreadable.
+    """
+    albums = []
+    for entry in os.scandir(root):
+        m = _ALBUM_DIR.fullmatch(entry.name)
+        if m and entry.is_dir() and int(m.group(1)) in album_ids:
+            albums.append((int(m.group(1)), Path(entry.path)))
+        elif m and entry.is_dir():
+            orphan_dir(Path(entry.path), int(m.group(1)))
+        else:
+            orphan_dir(Path(entry.path), None)
+
+    for album_id, album_dir in sorted(albums):
+        if after is not None and album_id < after[0]:
+            continue
+        files = []
+        try:
+            for entry in os.scandir(album_dir):
+                if entry.is_file():
+                    files.append((entry.name, False, Path(entry.path)))
+                elif entry.name == "originals" and entry.is_dir():
+                    files += [(o.name, True, Path(o.path))
+                              for o in os.scandir(entry.path) if o.is_file()]
+                else:
+                    orphan_dir(Path(entry.path), None)
+        except OSError:
+            unreadable(album_dir, album_id)
+            continue
+        for name, original, path in sorted(files):
+            if after is not None and (album_id, name) <= after:
+                continue
+            yield DiskEntry(album_id, name, path, original)
+
+
+def _stream_images(before: datetime, after: tuple[int, str] | None) -> Iterator:
+    """
+    Image rows ordered like the walk, fetched in keyset-paginated batches.
+    The session is closed after every batch, so no cursor or transaction
+    stays open (and no SQLite lock is held) while files are stat'ed and
+    hashed.
+    """
+    # compare filenames bytewise on both sides so the merge lines up
+    filename = Image.filename
+    if db.engine.dialect.name == "postgresql":
+        filename = Image.filename.collate("C")
+    # rows committed after the scan started may have files the walk missed
+    query = (
+        select(Image.id, Image.album_id, Image.filename, Image.file_size, Image.sha256)
+        .where(Image.upload_date < before)
+        .order_by(Image.album_id, filename)
+        .limit(_BATCH)
+    )
+    while True:
+        page = query
+        if after is not None:
+            page = page.where(or_(
+                Image.album_id > after[0],
+                and_(Image.album_id == after[0], filename > after[1]),
+            ))
+        rows = db.session.execute(page).all()
+        db.session.close()
+        yield from rows
+        if len(rows) < _BATCH:
+            return
+        after = rows[-1].album_id, rows[-1].filename
+
+
+def _sha256(path: Path, limiter: RateLimiter) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        while chunk := f.read(1 << 20):
+            limiter.consume(len(chunk))
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def scrub(
+    root: Path,
+    report: Callable[[str], None],
+    delete: bool = False,
+    verify: bool = False,
+    max_rate: float = 0,
+    grace: float = 3600,
+    state_file: Path | None = None,
+    resume: bool = False,
+    force: bool = False,
+    max_missing: float = 0.05,
+    max_orphans: float = 0.05,
+) -> Counter:
+    """
+    Merge-join the Image table with the storage tree and report (or, with
+    `delete`, remove) what only exists on one side:
+
+    - missing: rows whose file is gone (rows are deleted at the end)
+    - orphan: files without a row, older than `grace` seconds so uploads
+      that are still being committed are left alone
+    - orphan-dir: directories of deleted albums, also `grace` seconds old
+    - foreign: anything else in the tree; reported, never removed
+    - unreadable: album directories that could not be listed; their rows
+      are not counted as missing
+    - size / hash: file_size or sha256 (with `verify`) no longer match
+
+    Nothing is deleted until the scan is complete. An empty tree looks just
+    like an unmounted volume, and an empty Image table like the wrong
+    database, so unless `force` is set ScrubRefused is raised instead of
+    deleting anything when:
+
+    - no file was found at all, or more than `max_missing` of the scanned
+      rows are missing
+    - the Image table is empty, or more than `max_orphans` of the files
+      are orphans, counting those in orphan directories
+
+    Hashing reads are limited to `max_rate` bytes per second. Progress is
+    checkpointed to `state_file`, along with what was found so far; with
+    `resume` the scan continues from the last checkpoint instead of
+    starting over.
+    """
+    if not root.is_dir():
+        raise ScrubRefused(f"{root} is not a directory")
+    try:
+        next(os.scandir(root), None)
+    except OSError as e:
+        raise ScrubRefused(f"cannot read {root}: {e}") from e
+
+    counts: Counter = Counter()
+    limiter = RateLimiter(max_rate)
+    started = datetime.utcnow()
+    album_ids = {a for a, in db.session.query(Album.id)}
+    db.session.close()
+    after = None
+    scanned = 0
+    missing: dict[int, int] = {}
+    orphans: list[Path] = []
+    # filled by the walk thread, acted upon once it is done
+    stale_dirs: list[tuple[Path, int]] = []
+    foreign: list[Path] = []
+    unreadable: set[int] = set()
+    if resume and state_file is not None and state_file.exists():
+        state = json.loads(state_file.read_text())
+        album_id, name = state["after"]
+        after = (album_id, name)
+        scanned = state["scanned"]
+        counts.update(state["counts"])
+        missing = {int(i): a for i, a in state["missing"].items()}
+        orphans = [Path(p) for p in state["orphans"]]
+        unreadable = set(state["unreadable"])
+        report(f"resuming after album {album_id} / {name}")
+
+    def checkpoint(key: tuple[int, str]) -> None:
+        state_file.write_text(json.dumps({
+            "after": key,
+            "scanned": scanned,
+            "counts": counts,
+            "missing": missing,
+            "orphans": [str(p) for p in orphans],
+            "unreadable": sorted(unreadable),
+        }))
+
+    def orphan_dir(path: Path, album_id: int | None) -> None:
+        if album_id is None:
+            foreign.append(path)
+            report(f"foreign {path}")
+            return
+        try:
+            if time.time() - path.stat().st_mtime < grace:
+                return  # album created after the snapshot above
+        except FileNotFoundError:
+            return
+        stale_dirs.append((path, album_id))
+
+    def cannot_list(path: Path, album_id: int) -> None:
+        unreadable.add(album_id)
+        report(f"unreadable {path}")
+
+    def lost(row) -> None:
+        if row.album_id in unreadable:
+            return
+        if (root / f"album_{row.album_id}" / row.filename).exists():
+            return  # written after the walk listed its album
+        counts["missing"] += 1
+        report(f"missing image={row.id} album={row.album_id} {row.filename}")
+        missing[row.id] = row.album_id
+
+    rows = _stream_images(started, after)
+    row, row_seen = next(rows, None), False
+    entries = _prefetch(
+        _walk_storage(root, album_ids, after, orphan_dir, cannot_list))
+    for n, entry in enumerate(entries, 1):
+        try:
+            stat = entry.path.stat()
+        except FileNotFoundError:
+            continue  # rejected while we were scanning
+
+        while row is not None and (row.album_id, row.filename) < entry.key:
+            scanned += 1
+            if not row_seen:
+                lost(row)
+            row, row_seen = next(rows, None), False
+
+        counts["files"] += 1
+        if row is not None and (row.album_id, row.filename) == entry.key:
+            if not entry.original:
+                row_seen = True
+                size = stat.st_size
+                if size != row.file_size:
+                    counts["size"] += 1
+                    report(f"size image={row.id} {entry.path} db={row.file_size} disk={size}")
+                elif verify and row.sha256 and _sha256(entry.path, limiter) != row.sha256:
+                    counts["hash"] += 1
+                    report(f"hash image={row.id} {entry.path}")
+        elif time.time() - stat.st_mtime >= grace:
+            counts["orphan"] += 1
+            report(f"orphan {entry.path}")
+            orphans.append(entry.path)
+
+        if state_file is not None and n % _CHECKPOINT == 0:
+            checkpoint(entry.key)
+
+    while row is not None:
+        scanned += 1
+        if not row_seen:
+            lost(row)
+        row, row_seen = next(rows, None), False
+
+    # the scan is complete; nothing left to resume
+    if state_file is not None:
+        state_file.unlink(missing_ok=True)
+
+    # drop directories whose album was created while we were scanning
+    live = {a for a, in db.session.query(Album.id)}
+    has_images = db.session.query(Image.id).first() is not None
+    db.session.close()
+    stale_dirs = [(path, a) for path, a in stale_dirs if a not in live]
+    stale_files = 0
+    for path, _ in stale_dirs:
+        report(f"orphan-dir {path}")
+        stale_files += sum(1 for p in path.rglob("*") if p.is_file())
+
+    counts["orphan-dir"] = len(stale_dirs)
+    counts["foreign"] = len(foreign)
+    counts["unreadable"] = len(unreadable)
+    if delete and not force:
+        if missing and (counts["files"] == 0 or len(missing) > max_missing * scanned):
+            raise ScrubRefused(
+                f"{len(missing)} of {scanned} rows have no file; is the storage "
+                "mounted? Not deleting anything without --force", counts)
+        orphaned = len(orphans) + stale_files
+        if (orphans or stale_dirs) and (
+                not has_images
+                or orphaned > max_orphans * (counts["files"] + stale_files)):
+            raise ScrubRefused(
+                f"{orphaned} of {counts['files'] + stale_files} files have no row; "
+                "is this the right database? Not deleting anything without --force",
+                counts)
+
+    if not delete:
+        return counts
+
+    for path in orphans:
+        path.unlink(missing_ok=True)
+    for path, _ in stale_dirs:
+        shutil.rmtree(path, ignore_errors=True)
+
+    if missing:
+        ids = list(missing)
+        Change.record_comments("delete", ids)
+        Comment.query.filter(Comment.image_id.in_(ids)).delete(synchronize_session=False)
+        Image.query.filter(Image.id.in_(ids)).delete(synchronize_session=False)
+        search.remove_images(ids)
+        Change.record_many("image", "delete", missing)
+        AlbumStats.refresh(*missing.values())
+        db.session.commit()
+        response_cache.bump("albums", *{f"album:{a}" for a in missing.values()})
+
+    return counts
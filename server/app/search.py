@@ -0,0 +1,130 @@
+"""
+Full-text index over album names, original filenames and comments.
+
+SQLite uses an FTS5 virtual table, Postgres a table with a generated
+tsvector column and a GIN index; both are created by migration and are
+named `search_index`. Documents are written in the same transaction as
+the row they describe, so the index never needs a separate sync job
+(`flask search-reindex` rebuilds it from scratch if it ever drifts).
+"""
+import re
+from collections.abc import Iterable
+
+from sqlalchemy import bindparam, text
+
+from .models import Album, Comment, Image, db
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def _is_postgres() -> bool:
+    return db.engine.dialect.name == "postgresql"
+
+
+def _words(value: str) -> str:
+    # filenames come out of secure_filename as "campfire_night.jpg"
+    return " ".join(_WORD.findall(value.replace("_", " ")))
+
+
+def _add(kind: str, ref_id: int, album_id: int, image_id: int | None, body: str) -> None:
+    db.session.execute(
+        text(
+            "INSERT INTO search_index (kind, ref_id, album_id, image_id, body) "
+            "VALUES (:kind, :ref_id, :album_id, :image_id, :body)"
+        ),
+        {"kind": kind, "ref_id": ref_id, "album_id": album_id,
+         "image_id": image_id, "body": body},
+    )
+
+
+def index_album(album: Album) -> None:
+    _add("album", album.id, album.id, None, album.name)
+
+
+def index_image(image: Image) -> None:
+    _add("image", image.id, image.album_id, image.id, _words(image.original_name))
+
+
+def index_comment(comment: Comment) -> None:
+    _add("comment", comment.id, comment.image.album_id, comment.image_id, comment.content)
+
+
+def remove_images(image_ids: Iterable[int]) -> None:
+    """Drop the documents of images, including their comments."""
+    ids = list(image_ids)
+    if not ids:
+        return
+    db.session.execute(
+        text("DELETE FROM search_index WHERE image_id IN :ids").bindparams(
+            bindparam("ids", expanding=True)),
+        {"ids": ids},
+    )
+
+
+def rebuild() -> int:
+    """Re-create every document from the source tables. Returns the count."""
+    db.session.execute(text("DELETE FROM search_index"))
+    count = 0
+    for album in Album.query.yield_per(500):
+        index_album(album)
+        count += 1
+    for image in Image.query.yield_per(500):
+        index_image(image)
+        count += 1
+    comments = db.session.query(
+        Comment.id, Image.album_id, Comment.image_id, Comment.content
+    ).join(Image)
+    for comment_id, album_id, image_id, content in comments.yield_per(500):
+        _add("comment", comment_id, album_id, image_id, content)
+        count += 1
+    db.session.commit()
+    return count
+
+
+def search(query: str, page: int, per_page: int, approved_only: bool) -> tuple[list[dict], int]:
+    """
+    Ranked, paginated search. Every word is matched as a prefix.
+    Returns (hits, total).
+    """
+    words = _WORD.findall(query)
+    if not words:
+        return [], 0
+
+    if _is_postgres():
+        match = "search_index.tsv @@ to_tsquery('simple', :q)"
+        rank = "ts_rank(search_index.tsv, to_tsquery('simple', :q)) DESC"
+        snippet = "ts_headline('simple', search_index.body, to_tsquery('simple', :q))"
+        q = " & ".join(f"{w}:*" for w in words)
+    else:
+        match = "search_index MATCH :q"
+        rank = "bm25(search_index)"
+        snippet = "snippet(search_index, 0, '<b>', '</b>', '…', 12)"
+        q = " ".join(f'"{w}"*' for w in words)
+
+    where = f"WHERE {match}"
+    if approved_only:
+        where += " AND (search_index.image_id IS NULL OR image.status = 'approved')"
+    source = "FROM search_index LEFT JOIN image ON image.id = search_index.image_id "
+
+    total = db.session.execute(
+        text(f"SELECT count(*) {source}{where}"), {"q": q}).scalar()
+    rows = db.session.execute(
+        text(
+            "SELECT search_index.kind, search_index.ref_id, search_index.album_id, "
+            f"search_index.image_id, image.filename, {snippet} AS snippet "
+            f"{source}{where} ORDER BY {rank} LIMIT :limit OFFSET :offset"
+        ),
+        {"q": q, "limit": per_page, "offset": (page - 1) * per_page},
+    )
+    hits = [
+        {
+            "type": r.kind,
+            "id": r.ref_id,
+            "album_id": r.album_id,
+            "image_id": r.image_id,
+            "filename": r.filename,
+            "snippet": r.snippet,
+        }
+        for r in rows
+    ]
+    return hits, total
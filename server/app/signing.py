@@ -0,0 +1,43 @@
+"""
+Signed, expiring image URLs.
+
+A signature covers the album id, the file name and the expiry time, so
+serving a signed URL needs no database lookup. Expiry times are rounded up
+to a multiple of IMAGE_URL_TTL: every listing rendered within the same
+window hands out the same URL (browsers and proxies can cache the file),
+and a URL is always valid for at least IMAGE_URL_TTL seconds.
+"""
+import base64
+import hashlib
+import hmac
+import time
+
+from flask import current_app, url_for
+
+
+def _signature(album_id: int, filename: str, expires: int) -> str:
+    message = f"image-url:{album_id}/{filename}:{expires}".encode()
+    digest = hmac.new(
+        current_app.config["SECRET_KEY"].encode(), message, hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+def image_url(album_id: int, filename: str) -> str:
+    ttl = current_app.config["IMAGE_URL_TTL"]
+    expires = (int(time.time()) // ttl + 2) * ttl
+    return url_for(
+        "images.serve_signed_image", album_id=album_id, filename=filename,
+        e=expires, s=_signature(album_id, filename, expires))
+
+
+def verify(album_id: int, filename: str, expires: str, signature: str) -> int | None:
+    """Seconds the URL remains valid, or None if it is expired or forged."""
+    try:
+        expires = int(expires)
+    except ValueError:
+        return None
+    remaining = expires - int(time.time())
+    expected = _signature(album_id, filename, expires)
+    if not hmac.compare_digest(expected.encode(), signature.encode()):
+        return None
+    return remaining if remaining > 0 else None
@@ -0,0 +1,38 @@
+import logging
+import queue
+import threading
+from collections.abc import Iterable
+from pathlib import Path
+
+log = logging.getLogger(__name__)
+
+_delete_queue: "queue.Queue[Path]" = queue.Queue()
+_worker: threading.Thread | None = None
+_worker_lock = threading.Lock()
+
+
+def _drain_deletions() -> None:
+    while True:
+        path = _delete_queue.get()
+        try:
+            path.unlink(missing_ok=True)
+        except OSError:
+            log.exception("failed to delete %s", path)
+        finally:
+            _delete_queue.task_done()
+
+
+def queue_file_deletions(paths: Iterable[Path]) -> None:
+    """
+    Hand files over to a background worker for unlinking, so the request
+    does not wait on the disk. Under gunicorn's gevent worker the thread
+    is a greenlet.
+    """
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(
+                target=_drain_deletions, name="file-deleter", daemon=True)
+            _worker.start()
+    for path in paths:
+        _delete_queue.put(path)
@@ -1,28 +1,258 @@
+import functools
+import hashlib
+import shutil
+import subprocess
 import uuid
 from datetime import datetime
 from io import BytesIO
 from pathlib import Path
 
-from PIL import Image
+from flask import abort, current_app, request
+from flask import Response as FlaskResponse
+from PIL import Image, ImageOps
+from werkzeug.utils import send_file
 
 
-def save_image(album_dir: Path, original_name: str, raw_bytes: bytes) -> tuple[str, int]:
+def save_image(
+    album_dir: Path, original_name: str, raw_bytes: bytes,
+    strip_metadata: bool = False, keep_original: bool = False,
+) -> tuple[str, int, str]:
     """
-    Verify that the payload is a real image, then write it verbatim.
-    Returns (filename, bytes_written).
+    Verify that the payload is a real image, then write it verbatim, or,
+    with strip_metadata, JPEGs normalized by normalize_jpeg(). With
+    keep_original the untouched upload is also kept under originals/.
+    Returns (filename, bytes_written, sha256 of the bytes written).
     """
     album_dir.mkdir(parents=True, exist_ok=True)
 
     # basic validity check (does not modify bytes)
-    Image.open(BytesIO(raw_bytes)).verify()
+    with Image.open(BytesIO(raw_bytes)) as im:
+        im.verify()
+        is_jpeg = im.format == "JPEG"
 
     ts = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
     ext = Path(original_name).suffix or ".img"
     name = f"{ts}_{uuid.uuid4().hex[:8]}{ext}"
     dest = album_dir / name
 
-    dest.write_bytes(raw_bytes)
-    return name, len(raw_bytes)
+    data = raw_bytes
+    if strip_metadata and is_jpeg:
+        try:
+            data = normalize_jpeg(raw_bytes)
+        except (OSError, ValueError):
+            pass  # verify() is lenient; store what we got
+        if keep_original and data is not raw_bytes:
+            originals = album_dir / "originals"
+            originals.mkdir(exist_ok=True)
+            (originals / name).write_bytes(raw_bytes)
+
+    dest.write_bytes(data)
+    return name, len(data), hashlib.sha256(data).hexdigest()
+
+
+# EXIF orientation -> lossless jpegtran transform
+_JPEGTRAN_OPS = {
+    2: ["-flip", "horizontal"],
+    3: ["-rotate", "180"],
+    4: ["-flip", "vertical"],
+    5: ["-transpose"],
+    6: ["-rotate", "90"],
+    7: ["-transverse"],
+    8: ["-rotate", "270"],
+}
+
+
+def _jpeg_header(data: bytes) -> tuple[list[bytes], bytes]:
+    """
+    Split a JPEG into its marker segments before the first scan and the
+    rest of the primary image (scan data through EOI). Anything after the
+    first EOI, such as MPF previews appended by phones, is dropped.
+    """
+    segments = []
+    i = 2  # skip SOI
+    while i < len(data) - 3:
+        if data[i] != 0xFF:
+            raise ValueError("corrupt JPEG marker")
+        if data[i + 1] == 0xFF:  # fill byte
+            i += 1
+            continue
+        if data[i + 1] == 0xDA:  # SOS: entropy-coded data follows
+            break
+        end = i + 2 + int.from_bytes(data[i + 2:i + 4], "big")
+        segments.append(data[i:end])
+        i = end
+    eoi = data.find(b"\xff\xd9", i)
+    return segments, data[i:eoi + 2 if eoi != -1 else len(data)]
+
+
+def _is_app(segment: bytes, marker: int, prefix: bytes = b"") -> bool:
+    return segment[1] == marker and segment[4:4 + len(prefix)] == prefix
+
+
+def normalize_jpeg(raw_bytes: bytes) -> bytes:
+    """
+    Bake the EXIF orientation into the pixels and strip private or bulky
+    metadata: GPS, maker notes, embedded thumbnails and previews, XMP,
+    Photoshop blocks and comments. The ICC profile and the remaining EXIF
+    (with orientation reset to 1) are kept.
+
+    Without rotation the image data is copied byte for byte. Rotation uses
+    jpegtran -perfect when it is installed and re-encodes with Pillow
+    otherwise (or when the dimensions don't allow a perfect transform).
+    """
+    with Image.open(BytesIO(raw_bytes)) as im:
+        exif = im.getexif()
+        orientation = exif.get(0x0112, 1)
+
+        pixels = raw_bytes
+        if orientation in _JPEGTRAN_OPS:
+            jpegtran = shutil.which("jpegtran")
+            done = None
+            if jpegtran:
+                done = subprocess.run(
+                    [jpegtran, "-copy", "none", "-perfect", *_JPEGTRAN_OPS[orientation]],
+                    input=raw_bytes, capture_output=True,
+                )
+            if done is not None and done.returncode == 0:
+                pixels = done.stdout
+            else:
+                out = BytesIO()
+                ImageOps.exif_transpose(im).save(out, "JPEG", quality=92)
+                pixels = out.getvalue()
+
+        # copy into a fresh Exif so only what is picked here gets written:
+        # no GPS IFD, no maker note, no IFD1 (the embedded thumbnail)
+        clean = Image.Exif()
+        for tag, value in exif.items():
+            if tag not in (0x8769, 0x8825):
+                clean[tag] = value
+        if 0x0112 in clean:
+            clean[0x0112] = 1
+        # the interop pointer (0xA005) would dangle once rewritten, drop it
+        exif_ifd = {
+            tag: value for tag, value in exif.get_ifd(0x8769).items()
+            if tag not in (0x927C, 0xA005)
+        }
+        if exif_ifd:
+            clean[0x8769] = exif_ifd
+        clean_exif = clean.tobytes() if len(clean) else b""
+
+    segments, scan = _jpeg_header(pixels)
+    icc = [seg for seg in _jpeg_header(raw_bytes)[0]
+           if _is_app(seg, 0xE2, b"ICC_PROFILE\0")]
+    head = [seg for seg in segments if _is_app(seg, 0xE0)]
+    if clean_exif and len(clean_exif) <= 0xFFFF - 2:
+        head.append(b"\xff\xe1" + (len(clean_exif) + 2).to_bytes(2, "big") + clean_exif)
+    head += icc
+    # APP14 (Adobe) describes the color transform of this encoding, keep it;
+    # every other APPn and COM segment goes
+    head += [seg for seg in segments
+             if _is_app(seg, 0xEE) or not (0xE0 <= seg[1] <= 0xEF or seg[1] == 0xFE)]
+    return b"\xff\xd8" + b"".join(head) + scan
+
+
+def dhash(raw_bytes: bytes, size: int = 8) -> str:
+    """
+    Difference hash: compare neighbouring pixels of a tiny grayscale copy.
+    Returns size*size bits as hex. Near-identical photos (burst shots,
+    re-encodes) differ in only a few bits.
+    """
+    with Image.open(BytesIO(raw_bytes)) as im:
+        im.draft("L", (size * 4, size * 4))
+        small = ImageOps.exif_transpose(im).convert("L").resize(
+            (size + 1, size), Image.Resampling.LANCZOS)
+    px = small.tobytes()
+    bits = 0
+    for row in range(size):
+        for col in range(size):
+            left = px[row * (size + 1) + col]
+            bits = (bits << 1) | (left > px[row * (size + 1) + col + 1])
+    return f"{bits:0{size * size // 4}x}"
+
+
+def render_contact_sheet(paths: list[Path], tile: int = 160, columns: int = 6) -> bytes:
+    """
+    Paste thumbnails of the given files into a single JPEG grid, left to
+    right, top to bottom. Unreadable files leave an empty tile.
+    """
+    rows = max(1, -(-len(paths) // columns))
+    sheet = Image.new("RGB", (columns * tile, rows * tile), "white")
+    for i, path in enumerate(paths):
+        try:
+            with Image.open(path) as im:
+                # let the JPEG decoder downscale while decoding
+                im.draft("RGB", (tile, tile))
+                thumb = ImageOps.exif_transpose(im).convert("RGB")
+        except (OSError, Image.DecompressionBombError):
+            continue
+        thumb.thumbnail((tile, tile))
+        x = (i % columns) * tile + (tile - thumb.width) // 2
+        y = (i // columns) * tile + (tile - thumb.height) // 2
+        sheet.paste(thumb, (x, y))
+
+    out = BytesIO()
+    sheet.save(out, "JPEG", quality=80)
+    return out.getvalue()
+
+
+@functools.cache
+def _bounded(wrapper_type: type) -> type:
+    class BoundedFileWrapper(wrapper_type):
+        """Iterates at most `remaining` bytes from the current offset."""
+
+        def __iter__(self):
+            blksize = getattr(self, "blksize", 8192)
+            while self.remaining > 0:
+                data = self.filelike.read(min(blksize, self.remaining))
+                if not data:
+                    return
+                self.remaining -= len(data)
+                yield data
+
+    return BoundedFileWrapper
+
+
+class _FileResponse(FlaskResponse):
+    """
+    Response that keeps the server's wsgi.file_wrapper recognisable for 206
+    answers. Werkzeug normally wraps the body in a range iterator, which
+    hides the file from gunicorn and pushes every byte through Python.
+    gunicorn's FileWrapper sends Content-Length bytes starting at the
+    file's current offset with os.sendfile when it can, so a seek is all a
+    single range needs. When it can't (TLS, --no-sendfile) it iterates the
+    wrapper, so the wrapper is swapped for a subclass that stops after the
+    range instead of reading on to EOF.
+    """
+
+    def _wrap_range_response(self, start: int, length: int) -> None:
+        wrapper = self.response
+        filelike = getattr(wrapper, "filelike", None)
+        if self.status_code == 206 and filelike is not None:
+            filelike.seek(start)
+            bounded = object.__new__(_bounded(type(wrapper)))
+            bounded.__dict__.update(wrapper.__dict__)
+            bounded.remaining = length
+            self.response = bounded
+            return
+        super()._wrap_range_response(start, length)
+
+
+def send_image_file(path: Path):
+    """
+    Send a stored file with conditional and single-range (206) support.
+    If-Range is honored; multi-range requests get 416.
+    """
+    try:
+        return send_file(
+            path,
+            request.environ,
+            conditional=True,
+            use_x_sendfile=current_app.config["USE_X_SENDFILE"],
+            response_class=_FileResponse,
+            max_age=current_app.get_send_file_max_age,
+        )
+    except FileNotFoundError:
+        abort(404)
 
 
 class Identity:
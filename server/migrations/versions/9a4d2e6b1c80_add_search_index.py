@@ -0,0 +1,56 @@
+"""add search index
+
+Revision ID: 9a4d2e6b1c80
+Revises: 3c5e8a1f7b24
+Create Date: 2026-10-18 23:44:12.903114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a4d2e6b1c80'
+down_revision = '3c5e8a1f7b24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(
+            "CREATE TABLE search_index ("
+            " id BIGSERIAL PRIMARY KEY,"
+            " kind VARCHAR(16) NOT NULL,"
+            " ref_id INTEGER NOT NULL,"
+            " album_id INTEGER NOT NULL,"
+            " image_id INTEGER,"
+            " body TEXT NOT NULL,"
+            " tsv TSVECTOR GENERATED ALWAYS AS (to_tsvector('simple', body)) STORED)"
+        )
+        op.execute("CREATE INDEX ix_search_index_tsv ON search_index USING GIN (tsv)")
+        op.execute("CREATE INDEX ix_search_index_image_id ON search_index (image_id)")
+    else:
+        op.execute(
+            "CREATE VIRTUAL TABLE search_index USING fts5("
+            "body, kind UNINDEXED, ref_id UNINDEXED, album_id UNINDEXED, image_id UNINDEXED,"
+            " tokenize = 'unicode61 remove_diacritics 2')"
+        )
+
+    op.execute(
+        "INSERT INTO search_index (kind, ref_id, album_id, image_id, body) "
+        "SELECT 'album', id, id, NULL, name FROM album"
+    )
+    op.execute(
+        "INSERT INTO search_index (kind, ref_id, album_id, image_id, body) "
+        "SELECT 'image', id, album_id, id, replace(replace(original_name, '_', ' '), '.', ' ') FROM image"
+    )
+    op.execute(
+        "INSERT INTO search_index (kind, ref_id, album_id, image_id, body) "
+        "SELECT 'comment', comment.id, image.album_id, comment.image_id, comment.content "
+        "FROM comment JOIN image ON image.id = comment.image_id"
+    )
+
+
+def downgrade():
+    op.execute("DROP TABLE search_index")
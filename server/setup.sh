@@ -2,6 +2,8 @@ apt update && apt install -y python3 python3-pip python3-venv nginx
 python -m venv .venv
 source .venv/bin/activate
 pip install -r requirements.txt
+# with DATABASE_URL pointing at Postgres: pip install -r requirements-postgres.txt
+# with CACHE_REDIS_URL set: pip install -r requirements-redis.txt
 ln -s nginx.conf /etc/nginx/nginx.conf
 systemctl restart nginx
 systemctl enable nginx
@@ -0,0 +1,44 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Config is read at import time, so the environment has to be in place first
+_TMP = Path(tempfile.mkdtemp(prefix="image-service-tests-"))
+os.environ.update(
+    SECRET_KEY="test-secret",
+    ADMIN_API_KEY="test-admin",
+    CONSUMER_API_KEY="test-consumer",
+    DATABASE_URL=f"sqlite:///{_TMP / 'db.sqlite'}",
+    STORAGE_PATH=str(_TMP / "storage"),
+    EVENTS_SOCKET_DIR=str(_TMP / "events"),
+    RESPONSE_CACHE_DIR=str(_TMP / "cache"),
+)
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(_TMP, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def app():
+    from flask_migrate import upgrade
+
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        upgrade(directory=str(Path(__file__).resolve().parent.parent / "migrations"))
+    return app
+
+
+@pytest.fixture(scope="session")
+def env() -> dict:
+    return dict(os.environ)
+
+
+@pytest.fixture()
+def client(app):
+    return app.test_client()
@@ -0,0 +1,87 @@
+import io
+
+import pytest
+from PIL import Image as PILImage
+
+from app.cache import LocalBackend, response_cache
+
+ADMIN = {"Authorization": "Bearer test-admin", "X-Username": "admin"}
+CONSUMER = {"Authorization": "Bearer test-consumer", "X-Username": "bob"}
+
+
+@pytest.fixture(params=["local-backend", "file-counters"])
+def cache(app, request):
+    response_cache.init_app(
+        app, backend=LocalBackend() if request.param == "local-backend" else None)
+    yield response_cache
+    response_cache.init_app(app)
+
+
+@pytest.fixture()
+def album(client):
+    rv = client.post("/api/albums/", headers=ADMIN, json={"name": "Cache"})
+    return rv.get_json()["album"]["id"]
+
+
+def _upload(client, album_id, headers) -> int:
+    data = io.BytesIO()
+    PILImage.new("RGB", (16, 16), (200, 10, 10)).save(data, "JPEG")
+    rv = client.post(
+        "/api/images/upload", headers=headers, content_type="multipart/form-data",
+        data={"album_id": str(album_id), "image": (io.BytesIO(data.getvalue()), "a.jpg")})
+    return rv.get_json()["data"]["image_id"]
+
+
+def _ids(client, album_id, headers) -> list[int]:
+    rv = client.get(f"/api/images/album/{album_id}", headers=headers)
+    return sorted(i["id"] for i in rv.get_json()["images"])
+
+
+def test_hit_serves_cached_body(app, client, cache, album):
+    from app.models import Album, db
+
+    first = client.get("/api/albums/", headers=CONSUMER).get_data()
+    with app.app_context():
+        # behind the cache's back: no bump, so the cached body is served
+        db.session.get(Album, album).name = "Renamed"
+        db.session.commit()
+    assert client.get("/api/albums/", headers=CONSUMER).get_data() == first
+    cache.bump("albums")
+    assert b"Renamed" in client.get("/api/albums/", headers=CONSUMER).get_data()
+
+
+def test_create_album_invalidates(client, cache, album):
+    client.get("/api/albums/", headers=CONSUMER)
+    client.post("/api/albums/", headers=ADMIN, json={"name": "Fresh"})
+    names = [a["name"] for a in client.get("/api/albums/", headers=CONSUMER).get_json()["albums"]]
+    assert "Fresh" in names
+
+
+def test_writes_invalidate_album_listing(client, cache, album):
+    assert _ids(client, album, CONSUMER) == []
+    kept = _upload(client, album, ADMIN)
+    assert _ids(client, album, CONSUMER) == [kept]
+
+    pending = _upload(client, album, CONSUMER)
+    assert _ids(client, album, ADMIN) == [kept, pending]
+    assert _ids(client, album, CONSUMER) == [kept]
+
+    client.post(f"/api/images/{pending}/approve", headers=ADMIN)
+    assert _ids(client, album, CONSUMER) == [kept, pending]
+
+    client.post(f"/api/images/{pending}/reject", headers=ADMIN)
+    assert _ids(client, album, CONSUMER) == [kept]
+
+    client.post("/api/comments/", headers=CONSUMER, json={"image_id": kept, "content": "nice"})
+    images = client.get(f"/api/images/album/{album}", headers=CONSUMER).get_json()["images"]
+    assert images[0]["comment_count"] == 1
+
+
+def test_roles_are_cached_separately(client, cache, album):
+    _upload(client, album, CONSUMER)
+    consumer = client.get("/api/albums/", headers=CONSUMER).get_json()["albums"]
+    admin = client.get("/api/albums/", headers=ADMIN).get_json()["albums"]
+    assert "pending_count" not in consumer[0]
+    assert admin[0]["pending_count"] == 1
+    assert _ids(client, album, CONSUMER) == []
+    assert len(_ids(client, album, ADMIN)) == 1
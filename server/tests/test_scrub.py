@@ -0,0 +1,101 @@
+import io
+import os
+import time
+
+import pytest
+from PIL import Image as PILImage
+
+ADMIN = {"Authorization": "Bearer test-admin", "X-Username": "admin"}
+
+
+def _old(path) -> None:
+    past = time.time() - 2 * 3600
+    os.utime(path, (past, past))
+
+
+@pytest.fixture()
+def album(app, client):
+    """An album with images a.jpg and b.jpg; returns (album id, {name: id})."""
+    from app.models import Album, Image, db
+
+    album_id = client.post(
+        "/api/albums/", headers=ADMIN, json={"name": "Scrub"}).get_json()["album"]["id"]
+    ids = {}
+    for name in ("a.jpg", "b.jpg"):
+        data = io.BytesIO()
+        PILImage.new("RGB", (16, 16), (10, 200, 10)).save(data, "JPEG")
+        rv = client.post(
+            "/api/images/upload", headers=ADMIN, content_type="multipart/form-data",
+            data={"album_id": str(album_id), "image": (io.BytesIO(data.getvalue()), name)})
+        ids[name] = rv.get_json()["data"]["image_id"]
+    with app.app_context():
+        album_dir = Album.dir_for(album_id)
+        for name, image_id in ids.items():
+            image = db.session.get(Image, image_id)
+            (album_dir / image.filename).rename(album_dir / name)
+            image.filename = name
+        db.session.commit()
+    return album_id, ids
+
+
+def test_refusal_deletes_nothing(app, album):
+    from app.models import Album, Image, db
+    from app.scrub import ScrubRefused, scrub
+
+    album_id, ids = album
+    album_dir = Album.dir_for(album_id)
+    (album_dir / "a.jpg").unlink()
+    orphan = album_dir / "zz.jpg"
+    orphan.write_bytes(b"x")
+    _old(orphan)
+
+    with app.app_context():
+        with pytest.raises(ScrubRefused) as refused:
+            scrub(album_dir.parent, lambda line: None, delete=True,
+                  max_missing=1, max_orphans=0)
+        assert refused.value.counts["missing"] == 1
+        assert refused.value.counts["orphan"] == 1
+        # the missing row was allowed, but nothing goes before every check passed
+        assert orphan.exists()
+        assert db.session.get(Image, ids["a.jpg"]) is not None
+
+        counts = scrub(album_dir.parent, lambda line: None, delete=True, force=True)
+        assert counts["missing"] == 1 and counts["orphan"] == 1
+        assert not orphan.exists()
+        assert db.session.get(Image, ids["a.jpg"]) is None
+        assert db.session.get(Image, ids["b.jpg"]) is not None
+
+
+def test_resume_keeps_what_was_found(app, album, monkeypatch, tmp_path):
+    from app import scrub as scrub_module
+    from app.models import Album, Image, db
+    from app.scrub import scrub
+
+    album_id, ids = album
+    album_dir = Album.dir_for(album_id)
+    (album_dir / "a.jpg").unlink()
+    orphan = album_dir / "~z.jpg"
+    orphan.write_bytes(b"x")
+    _old(orphan)
+    state = tmp_path / "scrub.json"
+    monkeypatch.setattr(scrub_module, "_CHECKPOINT", 1)
+
+    def interrupt(line):
+        if line.startswith("orphan "):
+            raise KeyboardInterrupt
+
+    with app.app_context():
+        # a.jpg is found missing before b.jpg is checkpointed
+        with pytest.raises(KeyboardInterrupt):
+            scrub(album_dir.parent, interrupt, delete=True, state_file=state,
+                  max_missing=1, max_orphans=1)
+        assert db.session.get(Image, ids["a.jpg"]) is not None
+
+        lines = []
+        counts = scrub(album_dir.parent, lines.append, delete=True, state_file=state,
+                       resume=True, max_missing=1, max_orphans=1)
+        assert lines[0] == f"resuming after album {album_id} / b.jpg"
+        assert counts["missing"] == 1 and counts["orphan"] == 1
+        assert db.session.get(Image, ids["a.jpg"]) is None
+        assert not orphan.exists()
+        assert not state.exists()
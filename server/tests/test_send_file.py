@@ -0,0 +1,147 @@
+import hashlib
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import pytest
+from werkzeug.test import EnvironBuilder
+
+SIZE = 30 * 1024 * 1024
+SERVER_DIR = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture(scope="module")
+def big_image(app):
+    """A 30 MB approved image; returns (url path, sha256 of the content)."""
+    from app.models import Album, Image, User, UserRole, db
+
+    with app.app_context():
+        user = User(role=UserRole.ADMIN, username="range-test")
+        album = Album(name="Range", owner=user)
+        db.session.add(album)
+        db.session.flush()
+        album.dir_path.mkdir(parents=True, exist_ok=True)
+        data = os.urandom(SIZE)
+        (album.dir_path / "big.jpg").write_bytes(data)
+        db.session.add(Image(
+            filename="big.jpg", original_name="big.jpg", album=album,
+            uploader_id=user.id, file_size=SIZE, status='approved'))
+        db.session.commit()
+    return "/api/images/big.jpg", hashlib.sha256(data).hexdigest()
+
+
+def _resume(get, path: str, piece: int) -> tuple[bytes, list[int]]:
+    """Download `path` the way a client resumes: Range + If-Range per piece."""
+    first = get(path, {"Range": f"bytes=0-{piece - 1}"})
+    etag = first[1]["ETag"]
+    body, statuses = first[2], [first[0]]
+    while len(body) < SIZE:
+        status, _, chunk = get(path, {
+            "Range": f"bytes={len(body)}-{len(body) + piece - 1}",
+            "If-Range": etag,
+        })
+        statuses.append(status)
+        body += chunk
+    return body, statuses
+
+
+def test_resumed_download(client, big_image):
+    path, digest = big_image
+
+    def get(url, headers):
+        rv = client.get(url, headers=headers)
+        return rv.status_code, rv.headers, rv.data
+
+    body, statuses = _resume(get, path, 8 * 1024 * 1024)
+    assert statuses == [206, 206, 206, 206]
+    assert hashlib.sha256(body).hexdigest() == digest
+
+
+def test_stale_if_range_sends_whole_file(client, big_image):
+    path, digest = big_image
+    rv = client.get(path, headers={"Range": "bytes=100-199", "If-Range": '"stale"'})
+    assert rv.status_code == 200
+    assert hashlib.sha256(rv.data).hexdigest() == digest
+
+
+def test_multi_range_is_not_satisfiable(client, big_image):
+    path, _ = big_image
+    rv = client.get(path, headers={"Range": "bytes=0-9,20-29"})
+    assert rv.status_code == 416
+
+
+def test_range_through_server_file_wrapper_stops_at_range_end(app, big_image):
+    # what gunicorn does with its wrapper when it cannot sendfile: iterate it
+    gunicorn_wsgi = pytest.importorskip("gunicorn.http.wsgi")
+    path, _ = big_image
+    environ = EnvironBuilder(
+        path=path, headers={"Range": "bytes=1000-1999"},
+        environ_overrides={"wsgi.file_wrapper": gunicorn_wsgi.FileWrapper},
+    ).get_environ()
+    status = []
+    app_iter = app(environ, lambda s, headers: status.append(s))
+    try:
+        assert status == ["206 PARTIAL CONTENT"]
+        # still recognisable, so gunicorn would use sendfile where it can
+        assert isinstance(app_iter, gunicorn_wsgi.FileWrapper)
+        assert len(b"".join(app_iter)) == 1000
+    finally:
+        app_iter.close()
+
+
+@pytest.fixture(scope="module", params=["sendfile", "no-sendfile"])
+def gunicorn(request, big_image, env):
+    pytest.importorskip("gunicorn")
+    pytest.importorskip("gevent")
+    extra = ["--no-sendfile"] if request.param == "no-sendfile" else []
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-k", "gevent", "-w", "1",
+         "-b", f"127.0.0.1:{port}", *extra, "app:create_app()"],
+        cwd=SERVER_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        for _ in range(100):
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+                break
+            except OSError:
+                time.sleep(0.1)
+        else:
+            pytest.fail("gunicorn did not start")
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def _http_get(base: str):
+    def get(url, headers):
+        try:
+            with urllib.request.urlopen(urllib.request.Request(base + url, headers=headers)) as r:
+                return r.status, r.headers, r.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers, e.read()
+    return get
+
+
+def test_resumed_download_under_gunicorn(gunicorn, big_image):
+    # 206 responses keep gunicorn's file wrapper (and with it sendfile)
+    path, digest = big_image
+    get = _http_get(gunicorn)
+
+    body, statuses = _resume(get, path, 7 * 1024 * 1024)
+    assert set(statuses) == {206}
+    assert hashlib.sha256(body).hexdigest() == digest
+
+    status, _, data = get(path, {"Range": "bytes=100-199", "If-Range": '"stale"'})
+    assert status == 200 and len(data) == SIZE
+    assert get(path, {"Range": "bytes=0-9,20-29"})[0] == 416